@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Headless benchmarks for the Last-Letter Helper.
+
+Times WordSuggester.suggest, remove_word and reset_round and the overlay's full
+key-to-labels update path, over the bundled wordlist and generated dictionaries
+of 100k to 1M words. Sessions recorded in bench_sessions/ and generated game
+sessions are replayed key by key; per-key latency percentiles and peak memory
+are reported and saved as JSON so runs can be compared with a baseline:
+
+    python benchmark.py --output bench.json
+    python benchmark.py --baseline bench.json
+
+Runs on Qt's offscreen platform and never starts the keyboard listener.
+"""
+
+import argparse, json, os, random, sys, tempfile, time, tracemalloc
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import last_letter_engine as engine
+import wordbomb_typing_overlay as llh
+from PyQt5 import QtWidgets
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = Path(__file__).resolve().parent
+SESSION_DIR = ROOT / "bench_sessions"
+DEFAULT_SIZES = [100_000, 250_000, 500_000, 1_000_000]
+GENERATED_SESSION_WORDS = 60
+MICRO_REPEATS = 2000
+
+def percentiles(samples):
+    """p50/p95/p99/max of a list of seconds, in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {"count": len(ordered), "p50_ms": round(pick(0.50), 4), "p95_ms": round(pick(0.95), 4),
+            "p99_ms": round(pick(0.99), 4), "max_ms": round(ordered[-1] * 1000, 4)}
+
+def max_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+# -------------------- dictionaries --------------------
+def generate_dictionary(path, size, seed=0):
+    """Write size unique pseudo-words spliced together from the bundled list."""
+    rng = random.Random(seed)
+    base = engine.read_words(ROOT / "words_alpha.txt")
+    words = set(base)
+    while len(words) < size:
+        a, b = rng.choice(base), rng.choice(base)
+        words.add(a[:rng.randint(2, len(a))] + b[rng.randint(0, len(b) - 1):])
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(sorted(words)[:size]))
+
+def load_dictionary(source_path, cache_path):
+    """Compile and open a wordlist, recording timings and peak allocations."""
+    stats = {}
+    t0 = time.perf_counter()
+    engine.compile_wordlist(source_path, cache_path)
+    stats["compile_s"] = round(time.perf_counter() - t0, 3)
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    suggester = engine.WordSuggester.from_compiled(cache_path)
+    stats["open_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+    stats["open_peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+    tracemalloc.stop()
+    stats["words"] = len(suggester)
+    return suggester, stats
+
+# -------------------- sessions --------------------
+def expand_events(events):
+    keys = []
+    for event in events:
+        if event.startswith("<"):
+            keys.append({"<BS>": "BACKSPACE", "<ENTER>": "ENTER", "<RESET>": "RESET"}[event])
+        else:
+            keys.extend(event)
+    return keys
+
+def load_recorded_sessions():
+    sessions = {}
+    for path in sorted(SESSION_DIR.glob("*.json")):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        sessions[data.get("name", path.stem)] = expand_events(data["events"])
+    return sessions
+
+def generate_session(suggester, words=GENERATED_SESSION_WORDS, seed=0):
+    """A game where the player types one of the top suggestions each turn,
+    with the occasional typo corrected by backspace."""
+    rng = random.Random(seed)
+    suggester.reset_round()
+    events, required, used = [], "", set()
+    for _ in range(words):
+        required = suggester.viable_suffix(required)
+        options, _ = suggester.suggest(required, required, llh.SUGGESTION_COUNT, used)
+        if not options:
+            events.append("<RESET>")
+            suggester.reset_round()
+            required, used = "", set()
+            continue
+        word = rng.choice(options)
+        for c in word[len(required):]:
+            if rng.random() < 0.05:
+                events += [rng.choice("abcdefghijklmnopqrstuvwxyz"), "<BS>"]
+            events.append(c)
+        events.append("<ENTER>")
+        used.add(word)
+        suggester.remove_word(word)
+        required = word[-engine.CHAIN_SUFFIX_LENGTH:]
+    suggester.reset_round()
+    return expand_events(events)
+
+# -------------------- replays --------------------
+def replay_suggester(suggester, keys):
+    """Replay keys against the suggester alone, following the overlay's rules,
+    and time each query plus every removal and reset on the way."""
+    suggester.reset_round()
+    required, buffer, used = "", "", set()
+    query, remove, reset = [], [], []
+    for key in keys:
+        if key == "RESET":
+            t0 = time.perf_counter()
+            suggester.reset_round()
+            reset.append(time.perf_counter() - t0)
+            required, buffer, used = "", "", set()
+            continue
+        if key == "ENTER":
+            if buffer.isalpha() and buffer.startswith(required):
+                used.add(buffer)
+                t0 = time.perf_counter()
+                suggester.remove_word(buffer)
+                remove.append(time.perf_counter() - t0)
+                required = buffer[-engine.CHAIN_SUFFIX_LENGTH:]
+            buffer = required
+        elif key == "BACKSPACE":
+            if buffer != required:
+                buffer = buffer[:-1]
+        else:
+            buffer += key
+        t0 = time.perf_counter()
+        viable = suggester.viable_suffix(required)
+        if viable != required:
+            buffer = buffer[len(required) - len(viable):] if buffer.startswith(required) else viable
+            required = viable
+        suggester.suggest(required, buffer, llh.SUGGESTION_COUNT, used)
+        query.append(time.perf_counter() - t0)
+    suggester.reset_round()
+    return {"suggest": percentiles(query), "remove_word": percentiles(remove),
+            "reset_round": percentiles(reset)}
+
+def replay_overlay(app, suggester, keys):
+    """Feed keys to a real TypingOverlay and time each one until its labels are laid out."""
+    overlay = llh.TypingOverlay(suggester, async_suggestions=False)
+    app.processEvents()
+    samples = []
+    for key in keys:
+        t0 = time.perf_counter()
+        overlay.process_key(key)
+        app.processEvents()
+        samples.append(time.perf_counter() - t0)
+    overlay.close()
+    overlay.deleteLater()
+    app.processEvents()
+    suggester.reset_round()
+    return percentiles(samples)
+
+def micro_benchmarks(suggester, source_path, seed=0):
+    """Isolated remove_word / reset_round timings over random dictionary words."""
+    rng = random.Random(seed)
+    source_words = engine.read_words(source_path)
+    words = [rng.choice(source_words) for _ in range(MICRO_REPEATS)]
+    suggester.reset_round()
+    remove = []
+    for w in words:
+        t0 = time.perf_counter()
+        suggester.remove_word(w)
+        remove.append(time.perf_counter() - t0)
+    reset = []
+    for _ in range(200):
+        t0 = time.perf_counter()
+        suggester.reset_round()
+        reset.append(time.perf_counter() - t0)
+    suggester.reset_round()
+    return {"remove_word": percentiles(remove), "reset_round": percentiles(reset)}
+
+# -------------------- runner --------------------
+def bench_dictionary(app, name, source_path, cache_path, recorded):
+    print(f"[{name}] compiling {source_path}", flush=True)
+    suggester, stats = load_dictionary(source_path, cache_path)
+    result = {"load": stats, "micro": micro_benchmarks(suggester, source_path), "sessions": {}}
+    sessions = dict(recorded)
+    sessions["generated"] = generate_session(suggester)
+    for session_name, keys in sessions.items():
+        result["sessions"][session_name] = {
+            "keys": len(keys),
+            "suggester": replay_suggester(suggester, keys),
+            "overlay": replay_overlay(app, suggester, keys),
+        }
+        per_key = result["sessions"][session_name]["overlay"]
+        print(f"[{name}] {session_name}: overlay p50 {per_key['p50_ms']:.3f} ms, "
+              f"p99 {per_key['p99_ms']:.3f} ms", flush=True)
+    return result
+
+def flatten(tree, prefix=""):
+    flat = {}
+    for key, value in tree.items():
+        path = f"{prefix}/{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif key.endswith("_ms") or key.endswith("_s"):
+            flat[path] = value
+    return flat
+
+def compare(results, baseline, tolerance):
+    """Print metrics that got slower than tolerance allows; return how many did."""
+    current, previous = flatten(results["dictionaries"]), flatten(baseline["dictionaries"])
+    regressions = 0
+    for path in sorted(current.keys() & previous.keys()):
+        old, new = previous[path], current[path]
+        if old > 0 and new > old * (1 + tolerance) and new - old > 0.01:
+            regressions += 1
+            print(f"REGRESSION {path}: {old} -> {new} ({new / old:.2f}x)")
+    print(f"{regressions} regression(s) against baseline ({len(current.keys() & previous.keys())} metrics compared)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated generated dictionary sizes (empty for none)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown before a metric counts as a regression")
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    recorded = load_recorded_sessions()
+    results = {"created": time.time(), "python": sys.version.split()[0], "platform": sys.platform,
+               "dictionaries": {}}
+    with tempfile.TemporaryDirectory(prefix="llh-bench-") as tmp:
+        dictionaries = [("bundled", str(ROOT / "words_alpha.txt"))]
+        for size in filter(None, (s.strip() for s in args.sizes.split(","))):
+            path = os.path.join(tmp, f"generated-{size}.txt")
+            generate_dictionary(path, int(size))
+            dictionaries.append((f"generated-{size}", path))
+        for name, source_path in dictionaries:
+            cache_path = os.path.join(tmp, name + engine.WORDLIST_CACHE_SUFFIX)
+            results["dictionaries"][name] = bench_dictionary(app, name, source_path, cache_path, recorded)
+    results["max_rss_kb"] = max_rss_kb()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print("Wrote", args.output)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1101 @@
+"""
+Last-Letter Helper engine
+
+Wordlist loading, the compiled wordlist cache, WordSuggester, TrapSearch and
+the session journal. Has no GUI dependencies, so bots, test harnesses and
+last_letter_server.py can use it without PyQt5 or pynput.
+"""
+
+import sys, re, os, math, heapq, hashlib, mmap, struct, time, json, base64, threading
+from collections import defaultdict
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+WORDLIST_CANDIDATES = ["words_alpha.txt", "/usr/share/dict/words"]
+# Optional "word count" lines (or just words, most common first) for the
+# frequency ranking; the first file that exists is used.
+FREQUENCY_CANDIDATES = ["word_frequencies.txt"]
+FALLBACK_WORDS = ["test", "word", "bomb", "play", "game", "overlay",
+                  "autocomplete", "realistic", "typing", "longest", "suggestion", "epee", "gizmo"]
+# Typo-tolerant fallback: words whose start is within this edit distance of the
+# typed letters (1 from 3 typed letters past the required ones, 2 from 6), found
+# within FUZZY_TIME_BUDGET seconds per query.
+FUZZY_MAX_DISTANCE = 2
+FUZZY_TIME_BUDGET = 0.010
+
+def get_resource_path(relative_path):
+    try:
+        base_path = sys._MEIPASS
+    except AttributeError:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+def get_cache_dir():
+    base_path = (os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+                 or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base_path, "last-letter-helper")
+
+def find_wordlists():
+    """All wordlists from WORDLIST_CANDIDATES that exist; they are merged into one vocabulary."""
+    return [full_path for full_path in map(get_resource_path, WORDLIST_CANDIDATES)
+            if Path(full_path).exists()]
+
+def normalize_word(raw):
+    # Only plain a-z words can be typed into the overlay.
+    word = raw.strip().lower()
+    return word if word.isascii() and word.isalpha() else None
+
+def read_words(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return [w for w in map(normalize_word, f) if w]
+
+def _stream_words(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for word in map(normalize_word, f):
+            if word:
+                yield word
+
+def _sorted_words(path):
+    """The normalised words of one wordlist in sorted order (duplicates allowed).
+
+    A file that is already in order is checked in one pass and then streamed
+    from disk; only unsorted files are sorted in memory.
+    """
+    previous = ""
+    for word in _stream_words(path):
+        if word < previous:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                return sorted({w for w in map(normalize_word, f) if w})
+        previous = word
+    return _stream_words(path)
+
+def iter_wordlists(paths):
+    """Yield the normalised words of all wordlists once each, in sorted order."""
+    previous = None
+    for word in heapq.merge(*map(_sorted_words, paths)):
+        if word != previous:
+            yield word
+            previous = word
+
+def find_frequency_file():
+    for full_path in map(get_resource_path, FREQUENCY_CANDIDATES):
+        if Path(full_path).exists():
+            return full_path
+    return None
+
+def read_frequencies(path):
+    """Map normalised word -> count. Lines without a count are ranked by position."""
+    counts = {}
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        lines = f.read().splitlines()
+    for position, line in enumerate(lines):
+        parts = line.split()
+        word = normalize_word(parts[0]) if parts else None
+        if not word:
+            continue
+        try:
+            count = float(parts[1])
+        except (IndexError, ValueError):
+            count = len(lines) - position
+        if not math.isfinite(count) or count < 0:
+            continue  # "inf", "nan" or negative counts would break the cost scale
+        counts[word] = max(count, counts.get(word, 0))
+    return counts
+
+def load_wordlist():
+    paths = find_wordlists()
+    if paths:
+        return list(iter_wordlists(paths))
+    return list(FALLBACK_WORDS)
+
+# Sorts after every character that can appear in a word, so
+# [bisect(prefix), bisect(prefix + _PREFIX_END)) is the range of words with that prefix.
+_PREFIX_END = "\uffff"
+_UNCOMMON_LETTERS = frozenset("jqxzv")
+# Rank keys pack (length, difficulty, alphabetical index) into one int; the
+# index sits in the low bits so every key is unique and maps back to its word.
+_RANK_INDEX_BITS = 32
+_RANK_DIFFICULTY_BITS = 8
+_RANK_INDEX_MASK = (1 << _RANK_INDEX_BITS) - 1
+# Prefixes up to this length get a pre-sorted rank order; longer ones select top-k.
+RANKED_PREFIX_LEVELS = 3
+# The next required prefix is the last CHAIN_SUFFIX_LENGTH letters of the submitted word.
+CHAIN_SUFFIX_LENGTH = 3
+# Remaining-word counts are kept up to date for prefixes up to this length,
+# which covers every suffix the game can hand out.
+COUNTED_PREFIX_LEVELS = CHAIN_SUFFIX_LENGTH
+# Contains-queries use posting lists of every bigram and trigram of a-z
+# letters. A gram's code is its letters read as base-27 digits (a=1 .. z=26),
+# so bigram and trigram codes never collide and fit a dense table.
+_GRAM_CODES = 27 ** 3
+_PLAIN_WORD = re.compile(r"[a-z]+")
+
+# Frequency ranking cost per word, lower is better: rarity (natural log of how
+# much less frequent than the most frequent word) plus length plus the finger
+# travel between consecutive letters on a QWERTY keyboard, in key widths.
+FREQUENCY_WEIGHT = 1.0
+LENGTH_WEIGHT = 0.6
+TRAVEL_WEIGHT = 0.15
+# Costs are stored as fixed point with this many fractional bits.
+_COST_SCALE = 256
+_KEY_POSITIONS = {c: (x + row * 0.25 + (row == 2) * 0.25, row)
+                  for row, letters in enumerate(["qwertyuiop", "asdfghjkl", "zxcvbnm"])
+                  for x, c in enumerate(letters)}
+
+# Compiled wordlist cache: header, then 8-byte aligned sections holding the
+# word offsets (uint32[n+1]), rank keys (uint64[n]), the per-level rank orders
+# (uint32[n] each), the same keys and orders for the frequency ranking, the
+# gram posting-list offsets (uint32[_GRAM_CODES+1]), the postings (uint32[])
+# in default and in frequency rank order, and finally the sorted UTF-8 word
+# blob. The source digests cover the
+# frequency file too, so editing it rebuilds the cache.
+# Bump WORDLIST_CACHE_VERSION whenever the layout, the ranking or the word
+# normalisation changes.
+WORDLIST_CACHE_SUFFIX = ".llhc"
+WORDLIST_CACHE_VERSION = 5
+_CACHE_MAGIC = b"LLHDICT\0"
+# magic, version, little-endian flag, prefix levels, word count,
+# sha256 of the sources' (mtime_ns, size), sha256 of the sources' content
+_CACHE_HEADER = struct.Struct("<8sIIII32s32s")
+
+def _align8(n):
+    return (n + 7) & ~7
+
+def _as_paths(source_paths):
+    if isinstance(source_paths, (str, os.PathLike)):
+        return [os.fspath(source_paths)]
+    return [os.fspath(path) for path in source_paths]
+
+def _sources_stat_digest(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        st = os.stat(path)
+        digest.update(struct.pack("<qq", st.st_mtime_ns, st.st_size))
+    return digest.digest()
+
+def _sources_content_digest(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        digest.update(b"\0")
+    return digest.digest()
+
+def wordlist_cache_paths(source_paths):
+    """Cache files to try for a set of wordlists, most preferred first.
+
+    A compiled file next to the first source (e.g. bundled into _MEIPASS by
+    PyInstaller) wins; otherwise the per-user cache directory is used.
+    """
+    paths = [os.path.abspath(path) for path in _as_paths(source_paths)]
+    tag = hashlib.sha1("\0".join(paths).encode("utf-8")).hexdigest()[:12]
+    name = f"{Path(paths[0]).stem}-{tag}{WORDLIST_CACHE_SUFFIX}"
+    return [paths[0] + WORDLIST_CACHE_SUFFIX, os.path.join(get_cache_dir(), name)]
+
+def _fingerprinted(source_paths, frequency_path):
+    return _as_paths(source_paths) + ([os.fspath(frequency_path)] if frequency_path else [])
+
+def compile_wordlist(source_paths, target_path, frequency_path=None):
+    """Merge the given wordlists and write their binary cache to target_path."""
+    paths = _as_paths(source_paths)
+    frequencies = read_frequencies(frequency_path) if frequency_path else None
+    (blob, offsets, keys, orders, frequency_keys, frequency_orders,
+     gram_offsets, postings, frequency_postings) = WordSuggester._pack(iter_wordlists(paths),
+                                                                        frequencies)
+    fingerprinted = _fingerprinted(paths, frequency_path)
+    header = _CACHE_HEADER.pack(_CACHE_MAGIC, WORDLIST_CACHE_VERSION, sys.byteorder == "little",
+                                RANKED_PREFIX_LEVELS, len(keys), _sources_stat_digest(fingerprinted),
+                                _sources_content_digest(fingerprinted))
+    sections = [offsets.tobytes(), keys.tobytes()]
+    sections += [order.tobytes() for order in orders]
+    sections.append(frequency_keys.tobytes())
+    sections += [order.tobytes() for order in frequency_orders]
+    sections += [gram_offsets.tobytes(), postings.tobytes(), frequency_postings.tobytes(), blob]
+
+    os.makedirs(os.path.dirname(os.path.abspath(target_path)), exist_ok=True)
+    tmp_path = f"{target_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for section in sections:
+            f.write(b"\0" * (_align8(f.tell()) - f.tell()))
+            f.write(section)
+    os.replace(tmp_path, target_path)
+    return target_path
+
+def _cache_is_current(path, source_paths, frequency_path=None):
+    try:
+        with open(path, "rb") as f:
+            fields = _CACHE_HEADER.unpack(f.read(_CACHE_HEADER.size))
+    except (OSError, struct.error):
+        return False
+    magic, version, little, levels, _, stat_digest, content_digest = fields
+    if (magic != _CACHE_MAGIC or version != WORDLIST_CACHE_VERSION
+            or bool(little) != (sys.byteorder == "little") or levels != RANKED_PREFIX_LEVELS):
+        return False
+    paths = _fingerprinted(source_paths, frequency_path)
+    if stat_digest == _sources_stat_digest(paths):
+        return True
+    # Extracted or copied files (PyInstaller unpacks into a fresh _MEIPASS on
+    # every launch) get new mtimes, so fall back to comparing content.
+    return content_digest == _sources_content_digest(paths)
+
+def load_suggester(source_paths=None, frequency_path=None):
+    """Build the WordSuggester, going through the compiled cache when possible.
+
+    source_paths defaults to every wordlist find_wordlists() finds and
+    frequency_path to find_frequency_file().
+    """
+    source_paths = find_wordlists() if source_paths is None else _as_paths(source_paths)
+    if frequency_path is None:
+        frequency_path = find_frequency_file()
+    if not source_paths:
+        return WordSuggester(FALLBACK_WORDS)
+    candidates = wordlist_cache_paths(source_paths)
+    for cache_path in candidates:
+        if _cache_is_current(cache_path, source_paths, frequency_path):
+            return WordSuggester.from_compiled(cache_path)
+    try:
+        return WordSuggester.from_compiled(
+            compile_wordlist(source_paths, candidates[-1], frequency_path))
+    except OSError as e:
+        print("Wordlist cache error:", e)
+        frequencies = read_frequencies(frequency_path) if frequency_path else None
+        return WordSuggester.from_sorted(iter_wordlists(source_paths), frequencies)
+
+class _WordTable:
+    """Read-only sequence of words stored as one UTF-8 blob plus offsets.
+
+    Indexing decodes a single word on demand, so the vocabulary never exists
+    as one Python str per word.
+    """
+
+    def __init__(self, blob, offsets):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+class WordSuggester:
+    def __init__(self, words, frequencies=None):
+        # frequencies: optional word -> count mapping for the frequency ranking.
+        self._attach(*self._pack(sorted(set(words)), frequencies))
+
+    @classmethod
+    def from_sorted(cls, words, frequencies=None):
+        """Build from an iterable that is already sorted and free of duplicates."""
+        suggester = cls.__new__(cls)
+        suggester._attach(*cls._pack(words, frequencies))
+        return suggester
+
+    @classmethod
+    def from_compiled(cls, path):
+        """Open a cache written by compile_wordlist without decoding every word."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        count = _CACHE_HEADER.unpack_from(mapped)[4]
+        pos = _CACHE_HEADER.size
+
+        def section(fmt, length):
+            nonlocal pos
+            start = _align8(pos)
+            pos = start + length * struct.calcsize(fmt)
+            return view[start:pos].cast(fmt)
+
+        offsets = section("I", count + 1)
+        keys = section("Q", count)
+        orders = [section("I", count) for _ in range(RANKED_PREFIX_LEVELS + 1)]
+        frequency_keys = section("Q", count)
+        frequency_orders = [section("I", count) for _ in range(RANKED_PREFIX_LEVELS + 1)]
+        gram_offsets = section("I", _GRAM_CODES + 1)
+        postings = section("I", gram_offsets[_GRAM_CODES])
+        frequency_postings = section("I", gram_offsets[_GRAM_CODES])
+        blob = view[_align8(pos):_align8(pos) + offsets[count]]
+
+        suggester = cls.__new__(cls)
+        suggester._mapped = mapped
+        suggester._attach(blob, offsets, keys, orders, frequency_keys, frequency_orders,
+                          gram_offsets, postings, frequency_postings)
+        return suggester
+
+    @classmethod
+    def _pack(cls, words, frequencies=None):
+        """Pack sorted, unique words into (blob, offsets, rank keys, rank orders,
+        frequency keys, frequency orders, gram offsets, postings, frequency postings).
+
+        Everything is stored in flat bytes/arrays indexed by word id, the
+        word's position in sorted order. orders[n] lists the ids grouped by
+        their first n letters and sorted by rank inside each group. Groups
+        follow alphabetical order, so the group of a length-n prefix occupies
+        the same [lo, hi) slots as its id range.
+        """
+        frequencies = frequencies or {}
+        top_count = math.log1p(max(frequencies.values(), default=0))
+        blob = bytearray()
+        offsets = array("I", [0])
+        keys = array("Q")
+        frequency_keys = array("Q")
+        # group_starts[n]: ids where a new first-n-letters group begins
+        group_starts = [array("I") for _ in range(RANKED_PREFIX_LEVELS + 1)]
+        previous = None
+        for i, word in enumerate(words):
+            blob += word.encode("utf-8")
+            offsets.append(len(blob))
+            keys.append(cls._rank_key(word, i))
+            rarity = top_count - math.log1p(frequencies.get(word, 0))
+            frequency_keys.append(cls._frequency_key(word, i, rarity))
+            for n, starts in enumerate(group_starts):
+                if previous is None or word[:n] != previous[:n]:
+                    starts.append(i)
+            previous = word
+        orders = cls._rank_orders(group_starts, keys)
+        frequency_orders = cls._rank_orders(group_starts, frequency_keys)
+        blob = bytes(blob)
+        gram_offsets, postings = cls._index_grams(_WordTable(blob, offsets), orders[0])
+        frequency_postings = cls._rerank_postings(gram_offsets, postings, orders[0],
+                                                  frequency_orders[0])
+        return (blob, offsets, keys, orders, frequency_keys, frequency_orders,
+                gram_offsets, postings, frequency_postings)
+
+    @staticmethod
+    def _rank_orders(group_starts, keys):
+        orders = []
+        for starts in group_starts:
+            order = array("I")
+            for lo, hi in zip(starts, list(starts[1:]) + [len(keys)]):
+                order.extend(sorted(range(lo, hi), key=keys.__getitem__))
+            orders.append(order)
+        return orders
+
+    @staticmethod
+    def _gram_codes(word):
+        """Codes of the distinct bigrams and trigrams of word made of a-z letters."""
+        if _PLAIN_WORD.fullmatch(word):
+            v = [ord(c) - 96 for c in word]
+            codes = {v[k] * 27 + v[k + 1] for k in range(len(v) - 1)}
+            codes.update(v[k] * 729 + v[k + 1] * 27 + v[k + 2] for k in range(len(v) - 2))
+            return codes
+        return {code for n in (2, 3) for k in range(len(word) - n + 1)
+                for code in [WordSuggester._gram_code(word[k:k + n])] if code is not None}
+
+    @staticmethod
+    def _gram_code(gram):
+        if not _PLAIN_WORD.fullmatch(gram):
+            return None
+        code = 0
+        for c in gram:
+            code = code * 27 + ord(c) - 96
+        return code
+
+    @classmethod
+    def _index_grams(cls, words, rank_order):
+        # Postings hold rank positions (slots in rank_order), not word ids, so
+        # every list is in rank order and a contains-query can stop at the
+        # first `limit` hits.
+        lists = defaultdict(lambda: array("I"))
+        for pos, i in enumerate(rank_order):
+            for code in cls._gram_codes(words[i]):
+                lists[code].append(pos)
+        gram_offsets = array("I", [0])
+        postings = array("I")
+        for code in range(_GRAM_CODES):
+            postings.extend(lists.get(code, ()))
+            gram_offsets.append(len(postings))
+        return gram_offsets, postings
+
+    @staticmethod
+    def _rerank_postings(gram_offsets, postings, rank_order, other_order):
+        """The same posting lists as slots in other_order instead of rank_order."""
+        slots = array("I", bytes(4 * len(other_order)))
+        for pos, i in enumerate(other_order):
+            slots[i] = pos
+        reranked = array("I")
+        for code in range(_GRAM_CODES):
+            start, end = gram_offsets[code], gram_offsets[code + 1]
+            if start != end:
+                reranked.extend(sorted(slots[rank_order[p]] for p in postings[start:end]))
+        return reranked
+
+    def _attach(self, blob, offsets, keys, orders, frequency_keys, frequency_orders,
+                gram_offsets, postings, frequency_postings):
+        # The packed word table is the only copy of the vocabulary and never
+        # changes; everything else refers to words by id.
+        self._words = _WordTable(blob, offsets)
+        # (keys, orders) per ranking; indexed by the by_frequency flag.
+        self._rankings = ((keys, orders), (frequency_keys, frequency_orders))
+        self._gram_offsets = gram_offsets
+        # Posting lists per ranking, indexed like _rankings.
+        self._postings = (postings, frequency_postings)
+        self._used_cache = (None, frozenset())
+        self._fingerprint = None
+        # A word is removed when its stamp equals the current generation, so a new
+        # round only has to bump the generation to bring every word back.
+        self._removed = array("I", bytes(4 * len(self._words)))
+        self._generation = 0
+        # Bumped on every removal or reset so callers can tell when cached
+        # results derived from the live words went stale.
+        self.revision = 0
+        self.reset_round()
+
+    def __len__(self):
+        return len(self._words)
+
+    def reset_round(self):
+        if self._generation >= 0xFFFFFFFF:
+            self._removed = array("I", bytes(4 * len(self._words)))
+            self._generation = 0
+        self._generation += 1
+        self.revision += 1
+        # Words removed this round per short prefix ("" counts all of them);
+        # remaining(prefix) subtracts these from the size of the prefix range.
+        self._removed_counts = {}
+        # Ids removed this round, in removal order, for session snapshots.
+        self._removed_ids = array("I")
+
+    def fingerprint(self):
+        """Digest of the vocabulary; word ids are only comparable between equal fingerprints."""
+        if self._fingerprint is None:
+            digest = hashlib.sha1(struct.pack("<I", len(self._words)))
+            digest.update(self._words._offsets)
+            digest.update(self._words._blob)
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def removed_ids(self):
+        return array("I", self._removed_ids)
+
+    def restore_removed(self, ids):
+        """Start a new round with the given word ids already removed.
+
+        Same end state as remove_word for each of their words, without looking
+        any of them up again.
+        """
+        self.reset_round()
+        removed, generation, counts, words = self._removed, self._generation, self._removed_counts, self._words
+        for i in ids:
+            if i >= len(words) or removed[i] == generation:
+                continue
+            removed[i] = generation
+            self._removed_ids.append(i)
+            word = words[i]
+            for n in range(min(len(word), COUNTED_PREFIX_LEVELS) + 1):
+                counts[word[:n]] = counts.get(word[:n], 0) + 1
+
+    @staticmethod
+    def _difficulty_score(word: str) -> int:
+        return sum(1 for c in word if c in _UNCOMMON_LETTERS)
+
+    @classmethod
+    def _rank_key(cls, word: str, index: int) -> int:
+        difficulty = min(cls._difficulty_score(word), (1 << _RANK_DIFFICULTY_BITS) - 1)
+        return ((len(word) << (_RANK_INDEX_BITS + _RANK_DIFFICULTY_BITS))
+                | (difficulty << _RANK_INDEX_BITS) | index)
+
+    @staticmethod
+    def key_travel(word: str) -> float:
+        """Distance in key widths a finger travels typing word on QWERTY."""
+        points = [_KEY_POSITIONS[c] for c in word if c in _KEY_POSITIONS]
+        return sum(math.hypot(x2 - x1, y2 - y1) for (x1, y1), (x2, y2) in zip(points, points[1:]))
+
+    @classmethod
+    def _frequency_key(cls, word: str, index: int, rarity: float) -> int:
+        cost = (FREQUENCY_WEIGHT * rarity + LENGTH_WEIGHT * len(word)
+                + TRAVEL_WEIGHT * cls.key_travel(word))
+        return (min(int(cost * _COST_SCALE), (1 << 31) - 1) << _RANK_INDEX_BITS) | index
+
+    def _word_id(self, word: str):
+        i = bisect_left(self._words, word)
+        if i < len(self._words) and self._words[i] == word:
+            return i
+        return None
+
+    def _used_ids(self, used):
+        # Map the caller's used words to ids. Frozen sets (what the overlay
+        # passes) are cached by identity since they repeat across keystrokes.
+        if not used:
+            return frozenset()
+        cached_used, cached_ids = self._used_cache
+        if used is cached_used:
+            return cached_ids
+        ids = frozenset(i for i in map(self._word_id, used) if i is not None)
+        if isinstance(used, frozenset):
+            self._used_cache = (used, ids)
+        return ids
+
+    def is_word(self, word):
+        return self._word_id(word) is not None
+
+    def is_live(self, word):
+        """True if word is in the dictionary and has not been removed this round."""
+        i = self._word_id(word)
+        return i is not None and self._removed[i] != self._generation
+
+    def _prefix_range(self, prefix: str):
+        if not prefix:
+            return 0, len(self._words)
+        lo = bisect_left(self._words, prefix)
+        hi = bisect_left(self._words, prefix + _PREFIX_END, lo)
+        return lo, hi
+
+    def _best_ids(self, lo, hi, depth, limit, used_ids, by_frequency=False):
+        # Best-ranked live, unused ids in [lo, hi), the id range of a depth-letter prefix.
+        removed, generation = self._removed, self._generation
+        keys, orders = self._rankings[by_frequency]
+        if depth <= RANKED_PREFIX_LEVELS:
+            # Walk the pre-sorted group and stop as soon as we have enough.
+            order = orders[depth]
+            results = []
+            for pos in range(lo, hi):
+                i = order[pos]
+                if removed[i] != generation and i not in used_ids:
+                    results.append(i)
+                    if len(results) >= limit:
+                        break
+            return results
+        best = heapq.nsmallest(limit, (keys[i] for i in range(lo, hi)
+                                       if removed[i] != generation and i not in used_ids))
+        return [k & _RANK_INDEX_MASK for k in best]
+
+    def _top_matches(self, prefix: str, limit: int, used_ids, by_frequency=False):
+        if limit <= 0:
+            return []
+        lo, hi = self._prefix_range(prefix)
+        words = self._words
+        return [words[i] for i in self._best_ids(lo, hi, len(prefix), limit, used_ids, by_frequency)]
+
+    def _posting_ranges(self, fragment):
+        """[start, end) slices of the posting lists for the grams of fragment,
+        shortest first, or None when the index cannot answer for it."""
+        n = min(len(fragment), 3)
+        if n < 2:
+            return None
+        codes = {self._gram_code(fragment[k:k + n]) for k in range(len(fragment) - n + 1)}
+        if None in codes:
+            return None
+        offsets = self._gram_offsets
+        return sorted(((offsets[code], offsets[code + 1]) for code in codes),
+                      key=lambda r: r[1] - r[0])
+
+    def _containing(self, fragment: str, required: str, limit: int, used_ids, by_frequency=False):
+        if limit <= 0:
+            return []
+        lo, hi = self._prefix_range(required)
+        words, removed, generation = self._words, self._removed, self._generation
+        keys, orders = self._rankings[by_frequency]
+        ranges = self._posting_ranges(fragment)
+        results = []
+        if ranges is not None and ranges[0][1] - ranges[0][0] < hi - lo:
+            # Walk the rarest gram's postings in rank order; a candidate has to
+            # appear in every other gram's list (bisect from where the previous
+            # candidate was found) and then really contain the fragment.
+            postings, order = self._postings[by_frequency], orders[0]
+            (start, end), others = ranges[0], ranges[1:]
+            cursors = [s for s, _ in others]
+            for p in postings[start:end]:
+                i = order[p]
+                if not lo <= i < hi or removed[i] == generation or i in used_ids:
+                    continue
+                for k, (_, other_end) in enumerate(others):
+                    cursors[k] = j = bisect_left(postings, p, cursors[k], other_end)
+                    if j == other_end or postings[j] != p:
+                        break
+                else:
+                    if fragment in words[i]:
+                        results.append(i)
+                        if len(results) >= limit:
+                            break
+            return [words[i] for i in results]
+        if len(required) <= RANKED_PREFIX_LEVELS:
+            # The required prefix narrows things down more than any gram does:
+            # walk its rank-sorted group and test each word directly.
+            order = orders[len(required)]
+            for pos in range(lo, hi):
+                i = order[pos]
+                if removed[i] != generation and i not in used_ids:
+                    w = words[i]
+                    if fragment in w:
+                        results.append(w)
+                        if len(results) >= limit:
+                            break
+            return results
+        best = heapq.nsmallest(limit, (keys[i] for i in range(lo, hi)
+                                       if removed[i] != generation and i not in used_ids
+                                       and fragment in words[i]))
+        return [words[k & _RANK_INDEX_MASK] for k in best]
+
+    def suggest_containing(self, fragment: str, limit=5, used=None, required="", by_frequency=False):
+        """Best-ranked live words that contain fragment anywhere and start with required."""
+        return self._containing(fragment or "", required or "", limit, self._used_ids(used),
+                                by_frequency)
+
+    def _fuzzy(self, required: str, pattern: str, max_distance: int, limit: int, used_ids,
+               deadline: float, by_frequency=False):
+        if limit <= 0 or max_distance <= 0:
+            return []
+        words = self._words
+        # Levenshtein automaton walked over the implicit trie of the sorted
+        # words: a node is a prefix, its children are found by bisecting, and
+        # row[j] is the edit distance between pattern[:j] and the node's
+        # letters past required. A node with row[-1] <= max_distance matches
+        # its whole subtree; a branch is dropped once min(row) cannot beat
+        # the distance an ancestor already matched with.
+        lo, hi = self._prefix_range(required)
+        matches = []
+        stack = [(required, lo, hi, list(range(len(pattern) + 1)), max_distance + 1)]
+        while stack:
+            if time.perf_counter() > deadline:
+                break
+            prefix, lo, hi, row, bound = stack.pop()
+            depth = len(prefix)
+            pos = lo
+            if pos < hi and len(words[pos]) == depth:
+                pos += 1
+            while pos < hi:
+                c = words[pos][depth]
+                child = prefix + c
+                end = bisect_left(words, child + _PREFIX_END, pos, hi)
+                new = [row[0] + 1]
+                for j in range(1, len(row)):
+                    new.append(min(row[j - 1] + (pattern[j - 1] != c), row[j] + 1, new[j - 1] + 1))
+                child_bound = bound
+                if new[-1] < bound:
+                    matches.append((new[-1], pos, end, depth + 1))
+                    child_bound = new[-1]
+                if min(new) < child_bound:
+                    stack.append((child, pos, end, new, child_bound))
+                pos = end
+
+        # A word's distance is the best one among its matched ancestors; the
+        # top `limit` of each matched range is enough to find the overall top.
+        distances = {}
+        for distance, lo, hi, depth in matches:
+            for i in self._best_ids(lo, hi, depth, limit, used_ids, by_frequency):
+                if distances.get(i, max_distance + 1) > distance:
+                    distances[i] = distance
+        keys = self._rankings[by_frequency][0]
+        best = sorted(distances, key=lambda i: (distances[i], keys[i]))[:limit]
+        return [words[i] for i in best]
+
+    @staticmethod
+    def fuzzy_distance(pattern: str) -> int:
+        """Edit distance the fuzzy fallback allows for this many typed letters."""
+        return min(FUZZY_MAX_DISTANCE, len(pattern) // 3)
+
+    def suggest_fuzzy(self, required: str, letters: str, limit=5, used=None,
+                      max_distance=None, budget=FUZZY_TIME_BUDGET, by_frequency=False):
+        """Best-ranked live words that start with required and whose following
+        letters start within max_distance edits of letters, closest first.
+
+        Stops searching after budget seconds and returns what it found so far.
+        """
+        required, letters = required or "", letters or ""
+        if max_distance is None:
+            max_distance = self.fuzzy_distance(letters)
+        return self._fuzzy(required, letters, max_distance, limit, self._used_ids(used),
+                           time.perf_counter() + budget, by_frequency)
+
+    def suggest(self, required_letter: str, letters: str, limit=5, used=None, by_frequency=False):
+        """Top words for the typed letters and whether they are prefix matches.
+
+        by_frequency ranks by the blended frequency/length/key-travel cost
+        instead of by length and rare letters.
+
+        Falls back to words with the required letters that contain the typed
+        letters further in, then to words within a small edit distance of the
+        typed letters (typos), then to any word with the required letters, so
+        the player always sees a valid option when one exists.
+        """
+        used_ids = self._used_ids(used)
+        letters = letters or ""
+        required_letter = required_letter or ""
+
+        # Ensure we always respect the last-letter rule.
+        if required_letter:
+            if letters.startswith(required_letter):
+                prefix = letters
+            else:
+                prefix = required_letter + letters
+        else:
+            prefix = letters
+
+        results = self._top_matches(prefix, limit, used_ids, by_frequency)
+        prefix_mode = True
+
+        if not results and len(prefix) > len(required_letter):
+            results = self._containing(prefix, required_letter, limit, used_ids, by_frequency)
+            if not results:
+                pattern = prefix[len(required_letter):]
+                results = self._fuzzy(required_letter, pattern, self.fuzzy_distance(pattern),
+                                      limit, used_ids, time.perf_counter() + FUZZY_TIME_BUDGET,
+                                      by_frequency)
+            prefix_mode = not results
+        if not results and required_letter:
+            prefix_mode = False
+            results = self._top_matches(required_letter, limit, used_ids, by_frequency)
+
+        return results, prefix_mode
+
+    def remove_word(self, word):
+        word = word.lower()
+        i = self._word_id(word)
+        if i is None or self._removed[i] == self._generation:
+            return False
+        self._removed[i] = self._generation
+        self._removed_ids.append(i)
+        self.revision += 1
+        counts = self._removed_counts
+        for n in range(min(len(word), COUNTED_PREFIX_LEVELS) + 1):
+            counts[word[:n]] = counts.get(word[:n], 0) + 1
+        return True
+
+    def remaining(self, prefix: str) -> int:
+        """Number of words starting with prefix that are still available this round."""
+        lo, hi = self._prefix_range(prefix)
+        if len(prefix) <= COUNTED_PREFIX_LEVELS:
+            return hi - lo - self._removed_counts.get(prefix, 0)
+        removed, generation = self._removed, self._generation
+        return sum(1 for i in range(lo, hi) if removed[i] != generation)
+
+    def live_words(self, prefix: str):
+        """Yield the words starting with prefix that are still available, alphabetically."""
+        lo, hi = self._prefix_range(prefix)
+        words, removed, generation = self._words, self._removed, self._generation
+        for i in range(lo, hi):
+            if removed[i] != generation:
+                yield words[i]
+
+    def viable_suffix(self, required: str) -> str:
+        """Longest suffix of required that still has words left ("" if none does)."""
+        for start in range(len(required)):
+            if self.remaining(required[start:]):
+                return required[start:]
+        return ""
+
+class _SearchAborted(Exception):
+    pass
+
+class TrapSearch:
+    """Ranks candidate words by how little they leave the next player.
+
+    The game is a graph over required suffixes: playing a word from suffix s
+    moves the opponent to the word's last CHAIN_SUFFIX_LENGTH letters, relaxed
+    the same way the overlay relaxes an exhausted suffix. Candidates are scored
+    with a memoized, depth-limited negamax over that graph; iter_rankings
+    deepens one ply at a time until the time budget runs out.
+    """
+    WIN = 1.0
+    LOSS = -1.0
+
+    def __init__(self, suggester):
+        self.suggester = suggester
+        self._state = None
+        self._used = frozenset()
+        self._moves_cache = {}
+        self._memo = {}
+
+    def _sync(self, used):
+        # Both caches describe one round state; drop them once words were
+        # removed, the round was reset or the used set changed.
+        state = (self.suggester.revision, frozenset(used))
+        if state != self._state:
+            self._state = state
+            self._used = state[1]
+            self._moves_cache = {}
+            self._memo = {}
+
+    def _moves(self, suffix):
+        moves = self._moves_cache.get(suffix)
+        if moves is None:
+            moves = {}
+            for w in self.suggester.live_words(suffix):
+                if w not in self._used:
+                    target = w[-CHAIN_SUFFIX_LENGTH:]
+                    moves[target] = moves.get(target, 0) + 1
+            self._moves_cache[suffix] = moves
+        return moves
+
+    @staticmethod
+    def _mobility(count):
+        # Leaf heuristic for the player to move: more options is better, but
+        # never as good as a forced win.
+        return 0.9 * count / (count + 8)
+
+    def _value(self, suffix, depth, deadline, cancelled):
+        key = (suffix, depth)
+        value = self._memo.get(key)
+        if value is not None:
+            return value
+        if time.perf_counter() > deadline or (cancelled and cancelled()):
+            raise _SearchAborted
+        suffix = self.suggester.viable_suffix(suffix)
+        if depth == 0:
+            # Leaves only need a count, which the suggester keeps per prefix.
+            count = self.suggester.remaining(suffix) if suffix else 0
+            count -= sum(1 for w in self._used if w.startswith(suffix) and self.suggester.is_live(w))
+            value = self._mobility(count) if count > 0 else self.LOSS
+            self._memo[key] = value
+            return value
+        moves = self._moves(suffix) if suffix else {}
+        if not moves:
+            value = self.LOSS
+        else:
+            value = self.LOSS
+            for target in moves:
+                value = max(value, -self._value(target, depth - 1, deadline, cancelled))
+                if value >= self.WIN:
+                    break
+        self._memo[key] = value
+        return value
+
+    def iter_rankings(self, candidates, used=(), budget=0.25, max_depth=4, cancelled=None):
+        """Yield (depth, ranked candidates) for every search depth finished in time.
+
+        Ties keep the incoming order, so candidates should already be sorted
+        by the default ranking. cancelled is polled during the search.
+        """
+        deadline = time.perf_counter() + budget
+        self._sync(used)
+        for depth in range(1, max_depth + 1):
+            try:
+                scores = {w: -self._value(w[-CHAIN_SUFFIX_LENGTH:], depth - 1, deadline, cancelled)
+                          for w in candidates}
+            except _SearchAborted:
+                return
+            yield depth, sorted(candidates, key=lambda w: -scores[w])
+
+# -------------------- session journal --------------------
+# Submitted words and round resets are appended to a journal; after this many
+# records (and on every reset) the round is written out as a snapshot and the
+# journal starts over, so a restart never replays more than this many words.
+JOURNAL_SNAPSHOT_RECORDS = 64
+# Journal writes are fsynced together, at most this many seconds after the first
+# unsynced record.
+JOURNAL_FSYNC_INTERVAL = 1.0
+JOURNAL_VERSION = 1
+_JOURNAL_PATTERN = re.compile(r"journal-(\d+)\.jsonl$")
+
+def get_session_dir():
+    return os.path.join(get_cache_dir(), "session")
+
+def empty_round_state():
+    return {"used_words": [], "words_found": 0, "longest_word": 0, "required_letter": None}
+
+class SessionJournal:
+    """Append-only record of the overlay's rounds so a restart resumes the last one.
+
+    The directory holds snapshot.json (round state plus the suggester's removed
+    word ids up to record `seq`) and journal-<first>.jsonl files with the records
+    after it. Every record is written through to the OS straight away; fsyncs
+    and snapshot writes happen on a background thread, batched.
+
+    Call restore() once the suggester is loaded and before recording anything.
+    """
+
+    def __init__(self, directory, snapshot_every=JOURNAL_SNAPSHOT_RECORDS,
+                 fsync_interval=JOURNAL_FSYNC_INTERVAL):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync_interval = fsync_interval
+        self.suggester = None
+        self._file = None
+        self._next = None
+        self._snapshot_seq = 0
+        self._pending_snapshot = None
+        self._failed = False
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._snapshot_path = os.path.join(directory, "snapshot.json")
+
+    def _journal_files(self):
+        """(first record, path) of every journal file, oldest first."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        found = [(int(m.group(1)), os.path.join(self.directory, name))
+                 for name, m in ((name, _JOURNAL_PATTERN.match(name)) for name in names) if m]
+        return sorted(found)
+
+    def _read_snapshot(self, suggester):
+        try:
+            with open(self._snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if snapshot.get("version") != JOURNAL_VERSION:
+                return 0, empty_round_state()
+            state = dict(empty_round_state(), **snapshot["state"])
+            seq = int(snapshot["seq"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0, empty_round_state()
+        if snapshot.get("fingerprint") == suggester.fingerprint():
+            ids = array("I", base64.b64decode(snapshot.get("removed", "")))
+            if snapshot.get("little") != (sys.byteorder == "little"):
+                ids.byteswap()
+            suggester.restore_removed(ids)
+        else:
+            # Different wordlist: the ids mean nothing, fall back to the words.
+            suggester.reset_round()
+            for word in state["used_words"]:
+                suggester.remove_word(word)
+        return seq, state
+
+    def restore(self, suggester):
+        """Bring suggester to the journaled round and return that round's state.
+
+        The snapshot restores the removed words in one pass; only the journal
+        records written after it go through remove_word.
+        """
+        self.suggester = suggester
+        seq, state = self._read_snapshot(suggester)
+        last = seq
+        for first, path in self._journal_files():
+            try:
+                with open(path, "rb") as f:
+                    lines = f.readlines()
+            except OSError:
+                continue
+            end = 0
+            for line in lines:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated record")
+                    record = json.loads(line)
+                    n, op = record["n"], record["op"]
+                except (ValueError, KeyError, TypeError):
+                    # Torn write from a crash: cut it off, or the next record
+                    # appended to this file would be glued onto it.
+                    self._truncate(path, end)
+                    break
+                end += len(line)
+                if n <= seq:
+                    continue
+                if op == "submit":
+                    # Same bookkeeping as an accepted word in TypingOverlay.apply_key.
+                    word = record["word"]
+                    if word not in state["used_words"]:
+                        state["used_words"].append(word)
+                    suggester.remove_word(word)
+                    state["words_found"] += 1
+                    state["longest_word"] = max(state["longest_word"], len(word))
+                    state["required_letter"] = word[-CHAIN_SUFFIX_LENGTH:]
+                elif op == "reset":
+                    state = empty_round_state()
+                    suggester.reset_round()
+                last = max(last, n)
+        self._next = last + 1
+        self._snapshot_seq = seq
+        if last > seq:
+            # Compact what was just replayed so the next start is a pure snapshot load.
+            self._snapshot(last, state)
+        self._open(self._next)
+        threading.Thread(target=self._sync_loop, name="journal-sync", daemon=True).start()
+        return state
+
+    def _truncate(self, path, size):
+        try:
+            os.truncate(path, size)
+        except OSError as e:
+            print("Session journal repair failed:", e)
+
+    def _open(self, first):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._file = open(os.path.join(self.directory, f"journal-{first:010d}.jsonl"),
+                              "a", encoding="utf-8")
+        except OSError as e:
+            self._fail(e)
+
+    def _fail(self, error):
+        print("Session journal disabled:", error)
+        self._failed = True
+        self._file = None
+
+    def _append(self, record, state):
+        if self._failed or self._next is None:
+            return
+        n = self._next
+        self._next += 1
+        record["n"] = n
+        with self._lock:
+            try:
+                self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+                self._file.flush()
+            except (OSError, AttributeError) as e:
+                self._fail(e)
+                return
+        if record["op"] == "reset" or n - self._snapshot_seq >= self.snapshot_every:
+            self._snapshot(n, state())
+        self._dirty.set()
+
+    def submit(self, word, state):
+        """Record an accepted word. state() returns the round state after it."""
+        self._append({"op": "submit", "word": word}, state)
+
+    def reset(self, state):
+        self._append({"op": "reset"}, state)
+
+    def _snapshot(self, seq, state):
+        # Captured here, written by the sync thread: later records go to a new
+        # journal file, which the snapshot does not make obsolete.
+        self._snapshot_seq = seq
+        snapshot = {
+            "version": JOURNAL_VERSION,
+            "seq": seq,
+            "fingerprint": self.suggester.fingerprint(),
+            "little": sys.byteorder == "little",
+            "removed": base64.b64encode(self.suggester.removed_ids().tobytes()).decode("ascii"),
+            "state": dict(state, used_words=list(state["used_words"])),
+        }
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._open(seq + 1)
+            self._pending_snapshot = snapshot
+        self._dirty.set()
+
+    def _write_snapshot(self, snapshot):
+        tmp_path = self._snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._snapshot_path)
+        for first, path in self._journal_files():
+            if first <= snapshot["seq"]:
+                os.remove(path)
+
+    def sync(self):
+        """Make everything recorded so far durable."""
+        with self._lock:
+            self._dirty.clear()
+            snapshot, self._pending_snapshot = self._pending_snapshot, None
+            fd = os.dup(self._file.fileno()) if self._file is not None else None
+        try:
+            if snapshot is not None:
+                self._write_snapshot(snapshot)
+            if fd is not None:
+                os.fsync(fd)
+        except OSError as e:
+            print("Session journal sync failed:", e)
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def _sync_loop(self):
+        while True:
+            self._dirty.wait()
+            time.sleep(self.fsync_interval)  # let more records join this fsync
+            self.sync()
+
+    def close(self):
+        self.sync()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._failed = True
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Headless query server for the Last-Letter Helper.
+
+Serves the WordSuggester from last_letter_engine over a JSON-lines protocol,
+either on stdin/stdout or on a Unix socket that any number of clients can
+connect to. The dictionary is loaded once (through the compiled cache) and
+shared by every client; PyQt5 and pynput are never imported.
+
+    python last_letter_server.py                      # stdin/stdout
+    python last_letter_server.py --socket /tmp/llh.sock
+
+Every request is one JSON object per line and gets one JSON line back, with
+the request's "id" echoed:
+
+    {"id": 1, "op": "suggest", "session": "bot1",
+     "queries": [["a", "ab"], ["ing", "ingo", ["ingot"]],
+                 {"required": "q", "letters": "qz", "limit": 3, "mode": "fuzzy"},
+                 {"required": "t", "letters": "th", "ranking": "frequency"}]}
+    -> {"id": 1, "results": [{"words": [...], "prefix_mode": true}, ...]}
+    {"op": "use", "session": "bot1", "words": ["able"]}    mark words as played
+    {"op": "reset", "session": "bot1"}                       start a new round
+    {"op": "stats"}                                          throughput so far
+
+A query is [required, letters], [required, letters, used] or an object with
+those keys plus optional "limit", "mode" ("suggest", "contains" or "fuzzy")
+and "ranking" ("default" or "frequency"). Words a session has played are left
+out of all its results.
+"""
+
+import argparse, json, os, signal, socketserver, sys, threading, time
+
+import last_letter_engine as engine
+
+DEFAULT_LIMIT = 5
+QUERY_MODES = ("suggest", "contains", "fuzzy")
+QUERY_RANKINGS = ("default", "frequency")
+
+class Session:
+    """Used words of one client game; the suggester itself is never modified."""
+
+    def __init__(self):
+        self.used = set()
+        self.frozen = frozenset()
+
+    def use(self, words):
+        self.used.update(w.lower() for w in words)
+        self.frozen = frozenset(self.used)
+
+    def reset(self):
+        self.used = set()
+        self.frozen = frozenset()
+
+class ServerStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.queries = 0
+        self.busy = 0.0
+
+    def record(self, queries, elapsed):
+        with self._lock:
+            self.requests += 1
+            self.queries += queries
+            self.busy += elapsed
+
+    def snapshot(self):
+        with self._lock:
+            uptime = time.perf_counter() - self.started
+            return {
+                "uptime_s": round(uptime, 3),
+                "requests": self.requests,
+                "queries": self.queries,
+                "queries_per_s": round(self.queries / uptime, 1) if uptime else 0.0,
+                "busy_s": round(self.busy, 3),
+                "busy_queries_per_s": round(self.queries / self.busy, 1) if self.busy else 0.0,
+                "mean_query_us": round(self.busy / self.queries * 1e6, 1) if self.queries else 0.0,
+            }
+
+    def summary(self):
+        s = self.snapshot()
+        return (f"{s['queries']} queries in {s['requests']} requests over {s['uptime_s']} s: "
+                f"{s['queries_per_s']} q/s overall, {s['busy_queries_per_s']} q/s while busy, "
+                f"{s['mean_query_us']} us per query")
+
+class QueryServer:
+    """Answers protocol requests against one shared WordSuggester."""
+
+    def __init__(self, suggester, limit=DEFAULT_LIMIT):
+        self.suggester = suggester
+        self.limit = limit
+        self.stats = ServerStats()
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+
+    def session(self, name):
+        with self._sessions_lock:
+            session = self._sessions.get(name)
+            if session is None:
+                session = self._sessions[name] = Session()
+            return session
+
+    def query(self, session, query):
+        if isinstance(query, dict):
+            required, letters = query.get("required", ""), query.get("letters", "")
+            used, limit, mode = query.get("used"), query.get("limit", self.limit), query.get("mode", "suggest")
+            ranking = query.get("ranking", "default")
+        else:
+            required, letters, used = (list(query) + [None])[:3]
+            limit, mode, ranking = self.limit, "suggest", "default"
+        if mode not in QUERY_MODES:
+            raise ValueError(f"unknown mode {mode!r}")
+        if ranking not in QUERY_RANKINGS:
+            raise ValueError(f"unknown ranking {ranking!r}")
+        by_frequency = ranking == "frequency"
+        required, letters = (required or "").lower(), (letters or "").lower()
+        used = session.frozen | frozenset(w.lower() for w in used) if used else session.frozen
+        if mode == "contains":
+            return {"words": self.suggester.suggest_containing(letters, limit, used, required,
+                                                               by_frequency)}
+        if mode == "fuzzy":
+            return {"words": self.suggester.suggest_fuzzy(required, letters, limit, used,
+                                                          by_frequency=by_frequency)}
+        words, prefix_mode = self.suggester.suggest(required, letters, limit, used, by_frequency)
+        return {"words": words, "prefix_mode": prefix_mode}
+
+    def handle(self, request):
+        t0 = time.perf_counter()
+        op = request.get("op", "suggest")
+        if op in ("suggest", "use", "reset"):
+            session = self.session(str(request.get("session", "default")))
+        queries = 0
+        if op == "suggest":
+            batch = request.get("queries", [])
+            response = {"results": [self.query(session, q) for q in batch]}
+            queries = len(batch)
+        elif op == "use":
+            session.use(request.get("words", []))
+            response = {"used": len(session.used)}
+        elif op == "reset":
+            session.reset()
+            response = {"used": 0}
+        elif op == "stats":
+            response = {"stats": self.stats.snapshot(), "words": len(self.suggester)}
+        else:
+            raise ValueError(f"unknown op {op!r}")
+        self.stats.record(queries, time.perf_counter() - t0)
+        return response
+
+    def handle_line(self, line):
+        """One request line in, one response line out (None for blank lines)."""
+        if not line.strip():
+            return None
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            request_id = request.get("id")
+            response = self.handle(request)
+        except Exception as e:
+            response = {"error": f"{type(e).__name__}: {e}"}
+        if request_id is not None:
+            response["id"] = request_id
+        return json.dumps(response, separators=(",", ":"))
+
+    def serve_lines(self, lines, write):
+        for line in lines:
+            response = self.handle_line(line)
+            if response is not None:
+                write(response + "\n")
+
+def serve_stdio(server):
+    def write(text):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+    server.serve_lines(sys.stdin, write)
+
+def serve_socket(server, path):
+    if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+        sys.exit("Unix sockets are not available on this platform; use stdin/stdout.")
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            def write(text):
+                self.wfile.write(text.encode("utf-8"))
+                self.wfile.flush()
+            server.serve_lines((line.decode("utf-8", "replace") for line in self.rfile), write)
+
+    if os.path.exists(path):
+        os.unlink(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as listener:
+        listener.daemon_threads = True
+        try:
+            listener.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+
+def start_reporter(stats, interval):
+    def run():
+        while True:
+            time.sleep(interval)
+            print("Throughput:", stats.summary(), file=sys.stderr, flush=True)
+    threading.Thread(target=run, name="stats-report", daemon=True).start()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--socket", help="serve on this Unix socket instead of stdin/stdout")
+    parser.add_argument("--wordlist", action="append",
+                        help="wordlist to load (repeatable; default: the overlay's wordlists)")
+    parser.add_argument("--frequencies",
+                        help="word frequency file for the frequency ranking "
+                             "(default: word_frequencies.txt if present)")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT,
+                        help="suggestions per query unless the query sets its own limit")
+    parser.add_argument("--report-interval", type=float, default=0,
+                        help="print throughput to stderr every this many seconds (0: only on exit)")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    server = QueryServer(engine.load_suggester(args.wordlist, args.frequencies), args.limit)
+    print(f"Loaded {len(server.suggester)} words in {(time.perf_counter() - t0) * 1000:.0f} ms; "
+          f"serving on {args.socket or 'stdin/stdout'}", file=sys.stderr, flush=True)
+    if args.report_interval > 0:
+        start_reporter(server.stats, args.report_interval)
+    # Stop cleanly (socket removed, throughput printed) when terminated too.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        if args.socket:
+            serve_socket(server, args.socket)
+        else:
+            serve_stdio(server)
+    finally:
+        print("Throughput:", server.stats.summary(), file=sys.stderr, flush=True)
+
+if __name__ == "__main__":
+    main()
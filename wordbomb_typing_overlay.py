@@ -7,102 +7,138 @@ It keeps the overlay lightweight: no panic button, no automatic typing, just
 live suggestions that respect the last letter of the previously submitted word.
 """
 
-import sys, re, os, random, math
-from pathlib import Path
-from pynput import keyboard
-from pynput.keyboard import Controller as KController
+import sys, re, os, math, json, threading, time, queue
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from array import array
+
+# Taken before the GUI toolkit import so the startup report covers it.
+_STARTUP_T0 = time.perf_counter()
+_startup_marks = []
+
+def mark_startup(label):
+    _startup_marks.append((label, (time.perf_counter() - _STARTUP_T0) * 1000))
+
 from PyQt5 import QtWidgets, QtCore, QtGui
+import numpy as np
+mark_startup("qt import")
+
+from last_letter_engine import (
+    FALLBACK_WORDS, CHAIN_SUFFIX_LENGTH, find_wordlists, find_frequency_file,
+    wordlist_cache_paths, compile_wordlist, load_suggester, get_session_dir,
+    WordSuggester, TrapSearch, SessionJournal)
 
-WORDLIST_CANDIDATES = ["words_alpha.txt", "/usr/share/dict/words"]
 SUGGESTION_COUNT = 5
+# Rendered suggestion rows kept for reuse across keystrokes.
+ROW_CACHE_SIZE = 2048
 OVERLAY_WIDTH = 480
 OVERLAY_HEIGHT = 280
 MAX_PARTICLES = 50
+MAX_EXTRA_EFFECTS = 80
+EXTRA_EFFECT_COLORS = 8
+# GlowFrame ticks at FRAME_INTERVAL_MS while particles or the glow fade are
+# animating, at IDLE_FRAME_INTERVAL_MS while only the border rotates, and stops
+# once nothing changed for BORDER_IDLE_TIMEOUT_MS or the overlay is hidden.
+FRAME_INTERVAL_MS = 30
+IDLE_FRAME_INTERVAL_MS = 120
+BORDER_IDLE_TIMEOUT_MS = 10000
+BORDER_TURNS_PER_MS = 0.05 / FRAME_INTERVAL_MS
+# Latency tracing (F10 toggles it together with the HUD, F11 exports a Chrome trace).
+TRACE_CAPACITY = 512
+HUD_REFRESH_MS = 500
+# Ranking modes cycled with F9. "frequentie" ranks common, short, easy to type
+# words first (see the engine's FREQUENCY_WEIGHT and friends). "val" (trap)
+# re-ranks the best TRAP_CANDIDATES by a lookahead search that may use
+# TRAP_TIME_BUDGET seconds per keystroke.
+RANKING_MODES = ["standaard", "frequentie", "val"]
+TRAP_CANDIDATES = 30
+TRAP_TIME_BUDGET = 0.25
+TRAP_MAX_DEPTH = 6
+# Set to a file path to append one JSON line per startup, for tracking regressions.
+STARTUP_REPORT_ENV = "LLH_STARTUP_REPORT"
 
-def get_resource_path(relative_path):
-    try:
-        base_path = sys._MEIPASS
-    except AttributeError:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
-
-def load_wordlist():
-    for path in WORDLIST_CANDIDATES:
-        full_path = get_resource_path(path)
-        if Path(full_path).exists():
-            with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
-                return [w.strip().lower() for w in f if w.strip()]
-    return ["test", "word", "bomb", "play", "game", "overlay",
-            "autocomplete", "realistic", "typing", "longest", "suggestion", "epee", "gizmo"]
-
-class WordSuggester:
-    def __init__(self, words):
-        self.original_set = set(words)
-        self.reset_round()
-
-    def reset_round(self):
-        self._set = set(self.original_set)
-        self._list = sorted(self._set)
+class ParticleField:
+    """Fixed-capacity particle pool stored as parallel NumPy arrays.
 
-    @staticmethod
-    def _difficulty_score(word: str) -> int:
-        uncommon = set("jqxzv")
-        return sum(1 for c in word if c in uncommon)
-
-    def is_word(self, word):
-        return word in self.original_set
-
-    def suggest(self, required_letter: str, letters: str, limit=5, used=None):
-        if used is None:
-            used = set()
-        letters = letters or ""
-
-        # Ensure we always respect the last-letter rule.
-        if required_letter:
-            if letters.startswith(required_letter):
-                prefix = letters
-            else:
-                prefix = required_letter + letters
+    Live particles occupy the first `count` slots; step() updates them in one
+    batch and compacts the survivors to the front.
+    """
+    _FIELDS = (("x", np.float32), ("y", np.float32), ("vx", np.float32), ("vy", np.float32),
+               ("phase", np.float32), ("size", np.float32), ("alpha", np.int16),
+               ("life", np.int16), ("rgb", np.uint32))
+
+    def __init__(self, capacity, drift_x, drift_y, size_jitter):
+        self.capacity = capacity
+        self.count = 0
+        self.drift_x = drift_x
+        self.drift_y = drift_y
+        self.size_jitter = size_jitter
+        for name, dtype in self._FIELDS:
+            setattr(self, name, np.zeros(capacity, dtype))
+
+    def __len__(self):
+        return self.count
+
+    def room(self):
+        return self.capacity - self.count
+
+    def spawn(self, **values):
+        n = min(len(values["x"]), self.room())
+        if n <= 0:
+            return
+        live = slice(self.count, self.count + n)
+        for name, _ in self._FIELDS:
+            getattr(self, name)[live] = values[name][:n]
+        self.count += n
+
+    def step(self, rng):
+        n = self.count
+        if not n:
+            return
+        phase = self.phase[:n]
+        phase += 0.1
+        self.x[:n] += np.sin(phase) * self.drift_x + self.vx[:n]
+        if self.drift_y:
+            self.y[:n] += np.cos(phase) * self.drift_y + self.vy[:n]
         else:
-            prefix = letters
-
-        prefix_results = [w for w in self._list
-                          if w.startswith(prefix)
-                          and w not in used]
-        prefix_mode = True
-
-        # If nothing matches the current buffer, fall back to the required letter only
-        # so the player always sees at least one valid option when it exists.
-        if not prefix_results and required_letter:
-            prefix_mode = False
-            prefix_results = [w for w in self._list
-                              if w.startswith(required_letter)
-                              and w not in used]
-
-        results_sorted = sorted(prefix_results,
-                                key=lambda x: (len(x), self._difficulty_score(x), x))
-        return results_sorted[:limit], prefix_mode
-
-    def remove_word(self, word):
-        word = word.lower()
-        if word in self._set:
-            self._set.remove(word)
-            self._list = sorted(self._set)
-            return True
-        return False
-
-class FireParticle:
-    def __init__(self, x, y, size, color, vx, vy, life, phase):
-        self.x = x
-        self.y = y
-        self.size = size
-        self.color = color
-        self.vx = vx
-        self.vy = vy
-        self.life = life
-        self.phase = phase
+            self.y[:n] += self.vy[:n]
+        self.size[:n] = np.maximum(4, self.size[:n] + rng.uniform(-self.size_jitter, self.size_jitter, n))
+        self.alpha[:n] = np.clip(self.alpha[:n] + rng.integers(-15, 16, n), 20, 255)
+        self.life[:n] -= 1
+        alive = self.life[:n] > 0
+        survivors = int(np.count_nonzero(alive))
+        if survivors < n:
+            for name, _ in self._FIELDS:
+                field = getattr(self, name)
+                field[:survivors] = field[:n][alive]
+            self.count = survivors
+
+    def paint(self, painter):
+        # One filled path per (colour, alpha bucket) instead of a brush and an
+        # ellipse call per particle.
+        n = self.count
+        if not n:
+            return
+        keys = (self.rgb[:n] << 8) | (self.alpha[:n].astype(np.uint32) & 0xF0)
+        groups, members = np.unique(keys, return_inverse=True)
+        paths = [QtGui.QPainterPath() for _ in range(len(groups))]
+        for path in paths:
+            # The default odd-even rule would cut overlapping particles out.
+            path.setFillRule(QtCore.Qt.WindingFill)
+        for group, x, y, size in zip(members.ravel().tolist(), self.x[:n].tolist(),
+                                     self.y[:n].tolist(), self.size[:n].tolist()):
+            paths[group].addEllipse(x, y, size, size)
+        for key, path in zip(groups.tolist(), paths):
+            painter.fillPath(path, QtGui.QColor((key >> 24) & 0xFF, (key >> 16) & 0xFF,
+                                                (key >> 8) & 0xFF, key & 0xFF))
+
+def _pack_rgb(r, g, b):
+    return (r << 16) | (g << 8) | b
 
 class GlowFrame(QtWidgets.QFrame):
+    frame_painted = QtCore.pyqtSignal("qint64", "qint64")
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setAttribute(QtCore.Qt.WA_TranslucentBackground)
@@ -112,64 +148,127 @@ class GlowFrame(QtWidgets.QFrame):
         self.word_length = 0
         self.ready_for_fire = False
         self.panicking = False
-        self.particles = []
-        self.extra_effects = []
+        # Set by the overlay; paint times are reported to it while tracing is on.
+        self.tracer = None
+        self.rng = np.random.default_rng()
+        self.particles = ParticleField(MAX_PARTICLES, drift_x=0.5, drift_y=0.0, size_jitter=0.5)
+        self.extra_effects = ParticleField(MAX_EXTRA_EFFECTS, drift_x=0.8, drift_y=0.5, size_jitter=0.7)
+        # Extra effects pick from a small random palette so painting can batch them.
+        self.extra_palette = np.array(
+            [_pack_rgb(int(r), int(g), int(b)) for r, g, b in zip(
+                self.rng.integers(100, 256, EXTRA_EFFECT_COLORS),
+                self.rng.integers(50, 256, EXTRA_EFFECT_COLORS),
+                self.rng.integers(50, 256, EXTRA_EFFECT_COLORS))], np.uint32)
         self.fast_phase = 0.0
+        self._background = None
+        self._clock = QtCore.QElapsedTimer()
+        self._clock.start()
+        self._idle_clock = QtCore.QElapsedTimer()
+        self._idle_clock.start()
         self.timer = QtCore.QTimer(self)
         self.timer.timeout.connect(self.update_frame)
-        self.timer.start(30)
+        self.timer.start(FRAME_INTERVAL_MS)
 
     def set_glow(self, active: bool):
-        self.glow_active = active
+        if active != self.glow_active:
+            self.glow_active = active
+            self.wake()
+
+    def set_word_state(self, contains_mode: bool, word_length: int, ready_for_fire: bool):
+        state = (contains_mode, word_length, ready_for_fire)
+        if state != (self.contains_mode, self.word_length, self.ready_for_fire):
+            self.contains_mode, self.word_length, self.ready_for_fire = state
+            self.wake()
+
+    # -------------------- frame scheduling --------------------
+    def is_animating(self):
+        return bool(len(self.particles) or len(self.extra_effects)
+                    or (self.ready_for_fire and self.word_length >= 10)
+                    or self.glow_alpha != (1.0 if self.glow_active else 0.0))
+
+    def wake(self):
+        """Resume ticking after a state change and repaint right away."""
+        self._idle_clock.restart()
+        self._schedule()
+        self.update()
+
+    def _schedule(self):
+        if not self.isVisible():
+            self.timer.stop()
+            return
+        if self.is_animating():
+            self._idle_clock.restart()
+            interval = FRAME_INTERVAL_MS
+        elif self._idle_clock.elapsed() < BORDER_IDLE_TIMEOUT_MS:
+            interval = IDLE_FRAME_INTERVAL_MS
+        else:
+            self.timer.stop()
+            return
+        if not self.timer.isActive() or self.timer.interval() != interval:
+            # The rotation advances by elapsed time; do not count the time spent stopped.
+            if not self.timer.isActive():
+                self._clock.restart()
+            self.timer.start(interval)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.wake()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._background = None
 
     def spawn_particles(self):
         if self.ready_for_fire and self.word_length >= 10:
-            num_new = min(self.word_length-9, MAX_PARTICLES - len(self.particles))
-            for _ in range(num_new):
-                x = random.randint(20, OVERLAY_WIDTH-20)
-                y = OVERLAY_HEIGHT - random.randint(0,15)
-                size = random.randint(6,12)
-                t = min(self.word_length, MAX_PARTICLES)/MAX_PARTICLES
-                if self.glow_active:
-                    color = QtGui.QColor(0,255,200,random.randint(80,150))
-                else:
-                    r = int(50 + t*205)
-                    g = int(50 + t*150)
-                    b = int(200 - t*150)
-                    color = QtGui.QColor(r,g,b,random.randint(80,150))
-                vx = random.uniform(-0.5,0.5)
-                vy = random.uniform(-3,-1)
-                life = random.randint(40,70)
-                phase = random.uniform(0,2*math.pi)
-                self.particles.append(FireParticle(x,y,size,color,vx,vy,life,phase))
+            num_new = min(self.word_length-9, self.particles.room())
+            if num_new <= 0:
+                return
+            rng = self.rng
+            t = min(self.word_length, MAX_PARTICLES)/MAX_PARTICLES
+            if self.glow_active:
+                rgb = _pack_rgb(0, 255, 200)
+            else:
+                rgb = _pack_rgb(int(50 + t*205), int(50 + t*150), int(200 - t*150))
+            self.particles.spawn(
+                x=rng.integers(20, OVERLAY_WIDTH-20, num_new, endpoint=True),
+                y=OVERLAY_HEIGHT - rng.integers(0, 15, num_new, endpoint=True),
+                size=rng.integers(6, 12, num_new, endpoint=True),
+                rgb=np.full(num_new, rgb),
+                alpha=rng.integers(80, 150, num_new, endpoint=True),
+                vx=rng.uniform(-0.5, 0.5, num_new),
+                vy=rng.uniform(-3, -1, num_new),
+                life=rng.integers(40, 70, num_new, endpoint=True),
+                phase=rng.uniform(0, 2*math.pi, num_new))
 
     def spawn_extra_effects(self):
         if self.ready_for_fire and self.word_length >= 20:
-            for _ in range(4):
-                side = random.choice(['top','bottom','left','right'])
-                if side=='top':
-                    x = random.randint(-30, OVERLAY_WIDTH+30)
-                    y = -random.randint(5,30)
-                elif side=='bottom':
-                    x = random.randint(-30, OVERLAY_WIDTH+30)
-                    y = OVERLAY_HEIGHT + random.randint(5,30)
-                elif side=='left':
-                    x = -random.randint(5,30)
-                    y = random.randint(-20, OVERLAY_HEIGHT+20)
-                else:
-                    x = OVERLAY_WIDTH + random.randint(5,30)
-                    y = random.randint(-20, OVERLAY_HEIGHT+20)
-                size = random.randint(8,16)
-                color = QtGui.QColor(random.randint(100,255), random.randint(50,255), random.randint(50,255), random.randint(100,180))
-                vx = random.uniform(-1,1)
-                vy = random.uniform(-1,0)
-                life = random.randint(50,90)
-                phase = random.uniform(0, 2*math.pi)
-                self.extra_effects.append(FireParticle(x,y,size,color,vx,vy,life,phase))
+            num_new = min(4, self.extra_effects.room())
+            if num_new <= 0:
+                return
+            rng = self.rng
+            # 0 = top, 1 = bottom, 2 = left, 3 = right
+            side = rng.integers(0, 4, num_new)
+            along_x = rng.integers(-30, OVERLAY_WIDTH+30, num_new, endpoint=True)
+            along_y = rng.integers(-20, OVERLAY_HEIGHT+20, num_new, endpoint=True)
+            offset = rng.integers(5, 30, num_new, endpoint=True)
+            x = np.select([side < 2, side == 2], [along_x, -offset], OVERLAY_WIDTH + offset)
+            y = np.select([side == 0, side == 1], [-offset, OVERLAY_HEIGHT + offset], along_y)
+            self.extra_effects.spawn(
+                x=x, y=y,
+                size=rng.integers(8, 16, num_new, endpoint=True),
+                rgb=self.extra_palette[rng.integers(0, len(self.extra_palette), num_new)],
+                alpha=rng.integers(100, 180, num_new, endpoint=True),
+                vx=rng.uniform(-1, 1, num_new),
+                vy=rng.uniform(-1, 0, num_new),
+                life=rng.integers(50, 90, num_new, endpoint=True),
+                phase=rng.uniform(0, 2*math.pi, num_new))
 
     def update_frame(self):
-        self.fast_phase += 0.05
-        if self.fast_phase > 1.0: self.fast_phase = 0.0
+        self.fast_phase = (self.fast_phase + self._clock.restart() * BORDER_TURNS_PER_MS) % 1.0
 
         if self.glow_active:
             self.glow_alpha = min(1.0, self.glow_alpha+0.05)
@@ -178,50 +277,51 @@ class GlowFrame(QtWidgets.QFrame):
 
         self.spawn_particles()
         self.spawn_extra_effects()
-
-        for p in self.particles:
-            p.phase += 0.1
-            p.x += math.sin(p.phase)*0.5 + p.vx
-            p.y += p.vy
-            p.size = max(4,p.size + random.uniform(-0.5,0.5))
-            alpha = max(20, min(255, p.color.alpha() + random.randint(-15,15)))
-            p.color.setAlpha(alpha)
-            p.life -= 1
-        self.particles = [p for p in self.particles if p.life>0]
-
-        for p in self.extra_effects:
-            p.phase += 0.1
-            p.x += math.sin(p.phase)*0.8 + p.vx
-            p.y += math.cos(p.phase)*0.5 + p.vy
-            p.size = max(4,p.size + random.uniform(-0.7,0.7))
-            alpha = max(20, min(255, p.color.alpha() + random.randint(-15,15)))
-            p.color.setAlpha(alpha)
-            p.life -=1
-        self.extra_effects = [p for p in self.extra_effects if p.life>0]
+        self.particles.step(self.rng)
+        self.extra_effects.step(self.rng)
 
         self.update()
+        self._schedule()
+
+    def _background_pixmap(self):
+        # The background gradient only depends on the size, so render it once
+        # and reuse it until the next resize.
+        if self._background is None:
+            ratio = self.devicePixelRatioF()
+            pixmap = QtGui.QPixmap(self.size() * ratio)
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(QtCore.Qt.transparent)
+            painter = QtGui.QPainter(pixmap)
+            painter.setRenderHint(QtGui.QPainter.Antialiasing)
+            rect = self.rect()
+            bg_grad = QtGui.QLinearGradient(0,0,0,rect.height())
+            bg_grad.setColorAt(0, QtGui.QColor(25,25,40,230))
+            bg_grad.setColorAt(1, QtGui.QColor(10,10,20,220))
+            painter.setBrush(QtGui.QBrush(bg_grad))
+            painter.setPen(QtCore.Qt.NoPen)
+            painter.drawRoundedRect(rect,14,14)
+            painter.end()
+            self._background = pixmap
+        return self._background
 
     def paintEvent(self,event):
+        tracer = self.tracer
+        if tracer is not None and tracer.enabled:
+            start_ns = time.perf_counter_ns()
+            self._paint(event)
+            self.frame_painted.emit(start_ns, time.perf_counter_ns())
+        else:
+            self._paint(event)
+
+    def _paint(self,event):
         painter = QtGui.QPainter(self)
         painter.setRenderHint(QtGui.QPainter.Antialiasing)
         rect = self.rect()
 
-        for p in self.particles:
-            painter.setBrush(QtGui.QBrush(p.color))
-            painter.setPen(QtCore.Qt.NoPen)
-            painter.drawEllipse(int(p.x),int(p.y),int(p.size),int(p.size))
-
-        for p in self.extra_effects:
-            painter.setBrush(QtGui.QBrush(p.color))
-            painter.setPen(QtCore.Qt.NoPen)
-            painter.drawEllipse(int(p.x),int(p.y),int(p.size),int(p.size))
+        self.particles.paint(painter)
+        self.extra_effects.paint(painter)
 
-        bg_grad = QtGui.QLinearGradient(0,0,0,rect.height())
-        bg_grad.setColorAt(0, QtGui.QColor(25,25,40,230))
-        bg_grad.setColorAt(1, QtGui.QColor(10,10,20,220))
-        painter.setBrush(QtGui.QBrush(bg_grad))
-        painter.setPen(QtCore.Qt.NoPen)
-        painter.drawRoundedRect(rect,14,14)
+        painter.drawPixmap(0, 0, self._background_pixmap())
 
         border_rect = rect.adjusted(2,2,-2,-2)
         slow_grad = QtGui.QConicalGradient(border_rect.center(),self.fast_phase*360)
@@ -259,21 +359,230 @@ class GlowFrame(QtWidgets.QFrame):
             painter.setPen(pen)
             painter.drawRoundedRect(border_rect,14,14)
 
+# One suggestion query. seq orders requests; used_generation changes whenever a
+# word is submitted or a round starts, so results computed against older round
+# state can be recognised and dropped.
+SuggestionRequest = namedtuple(
+    "SuggestionRequest", "seq required letters limit by_frequency used used_generation trace")
+
+class LatencyTracer:
+    """Per-keystroke stage timestamps kept in a fixed-size ring buffer.
+
+    A trace is a list of perf_counter_ns stamps, one per entry of STAGES, that
+    travels with the key from the listener callback to the next paint. Only
+    completed traces are kept. When disabled, callers check `enabled` and do
+    nothing else.
+    """
+    STAGES = ("listener", "deliver", "query_start", "query_end", "render_start", "render_end", "paint")
+    LISTENER, DELIVER, QUERY_START, QUERY_END, RENDER_START, RENDER_END, PAINT = range(len(STAGES))
+
+    def __init__(self, capacity=TRACE_CAPACITY):
+        self.enabled = False
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        self._traces = [None] * self.capacity
+        self._trace_count = 0
+        self._frames = array("d", bytes(8 * self.capacity))
+        self._frame_count = 0
+
+    def set_enabled(self, enabled):
+        self.clear()
+        self.enabled = enabled
+
+    def start(self, listener_ns=None):
+        """Open a trace for a key delivered on the GUI thread."""
+        now = time.perf_counter_ns()
+        trace = [0] * len(self.STAGES)
+        trace[self.LISTENER] = listener_ns or now
+        trace[self.DELIVER] = now
+        return trace
+
+    @staticmethod
+    def stamp(trace, stage):
+        trace[stage] = time.perf_counter_ns()
+
+    def commit(self, trace):
+        self._traces[self._trace_count % self.capacity] = trace
+        self._trace_count += 1
+
+    def record_frame(self, start_ns, end_ns):
+        self._frames[self._frame_count % self.capacity] = (end_ns - start_ns) / 1e6
+        self._frame_count += 1
+
+    def traces(self):
+        count = min(self._trace_count, self.capacity)
+        start = self._trace_count - count
+        return [self._traces[i % self.capacity] for i in range(start, start + count)]
+
+    @staticmethod
+    def _percentiles(values):
+        ordered = sorted(values)
+        if not ordered:
+            return None
+        return [ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in (0.5, 0.95, 0.99)]
+
+    def summary(self):
+        """Rolling p50/p95/p99 in ms for key-to-paint, the query and paint time."""
+        traces = self.traces()
+        frames = self._frames[:min(self._frame_count, self.capacity)]
+        return {
+            "key": self._percentiles([(t[self.PAINT] - t[self.LISTENER]) / 1e6 for t in traces]),
+            "query": self._percentiles([(t[self.QUERY_END] - t[self.QUERY_START]) / 1e6 for t in traces]),
+            "frame": self._percentiles(frames),
+            "samples": len(traces),
+        }
+
+    def export_chrome_trace(self, path):
+        """Write the buffered traces in Chrome's trace event format (chrome://tracing)."""
+        spans = [("queue", self.LISTENER, self.DELIVER, 1), ("dispatch", self.DELIVER, self.QUERY_START, 1),
+                 ("query", self.QUERY_START, self.QUERY_END, 2), ("handoff", self.QUERY_END, self.RENDER_START, 1),
+                 ("render", self.RENDER_START, self.RENDER_END, 1), ("paint", self.RENDER_END, self.PAINT, 1)]
+        events = []
+        for n, trace in enumerate(self.traces()):
+            for name, start, end, tid in spans:
+                events.append({"name": name, "cat": "key", "ph": "X", "pid": 1, "tid": tid,
+                               "ts": trace[start] / 1000, "dur": max(0, trace[end] - trace[start]) / 1000,
+                               "args": {"key": n}})
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "gui"}})
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": 2, "args": {"name": "suggestions"}})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
+
+class SuggestionWorker:
+    """Runs suggestion queries on a background thread, newest request wins.
+
+    post() replaces a request that has not started yet, so a burst of keys
+    leaves at most one query running and one waiting.
+    """
+
+    def __init__(self, compute, deliver):
+        self._compute = compute
+        self._deliver = deliver
+        self._cond = threading.Condition()
+        self._request = None
+        threading.Thread(target=self._run, name="suggestions", daemon=True).start()
+
+    def post(self, request):
+        with self._cond:
+            self._request = request
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._request is None:
+                    self._cond.wait()
+                request, self._request = self._request, None
+            try:
+                result = self._compute(request)
+            except Exception as e:
+                print("Suggestion error:", e)
+                continue
+            self._deliver(request, result)
+
+_ROW_COLORS = {
+    "prefix": "<span style='color:#00ff88; font-weight:700'>",
+    "contains": "<span style='color:#3399ff; font-weight:700'>",
+    "required": "<span style='color:#ffaa00; font-weight:700'>",
+    "other": "<span style='color:#ff5555'>",
+}
+
+@lru_cache(maxsize=ROW_CACHE_SIZE)
+def render_suggestion_row(word, typed, required, best):
+    """Rich text for one suggestion row. Letters of the typed prefix are green,
+    letters of an in-word match blue, a matching required first letter orange."""
+    prefix_match = word.startswith(typed)
+    contains = bool(typed) and typed in word
+    runs = []
+    for i, c in enumerate(word):
+        if i < len(typed) and prefix_match:
+            color = "prefix"
+        elif contains and c.lower() in typed:
+            color = "contains"
+        elif required and i == 0 and c.lower() == required:
+            color = "required"
+        else:
+            color = "other"
+        # Neighbouring letters of the same colour share one span.
+        if runs and runs[-1][0] == color:
+            runs[-1][1] += c
+        else:
+            runs.append([color, c])
+    row = "".join(f"{_ROW_COLORS[color]}{text}</span>" for color, text in runs)
+    if best:
+        row = f"<span style='background-color:rgba(255,215,0,0.12); padding:2px 4px;'>{row}</span>"
+    return row
+
+def set_label_text(label, text):
+    # setText makes a rich-text QLabel re-parse and relayout; skip it when nothing changed.
+    if label.text() != text:
+        label.setText(text)
+
+def set_label_style(label, style):
+    # Same for setStyleSheet, which re-polishes the widget.
+    if label.styleSheet() != style:
+        label.setStyleSheet(style)
+
 class TypingOverlay(QtWidgets.QWidget):
-    update_signal = QtCore.pyqtSignal(str)
+    input_ready = QtCore.pyqtSignal()
+    dictionary_ready = QtCore.pyqtSignal(object)
+    trap_ranking_ready = QtCore.pyqtSignal(int, int, object)
+    suggestions_ready = QtCore.pyqtSignal(object, object)
 
-    def __init__(self,suggester):
+    def __init__(self,suggester=None,async_suggestions=True,journal=None):
         super().__init__()
+        # None while the dictionary is still loading; keys typed meanwhile are
+        # kept in pending_keys and replayed once it arrives.
         self.suggester = suggester
+        self.pending_keys = []
+        # SessionJournal that records the round and restores it on the next
+        # start; None keeps rounds in memory only.
+        self.journal = journal
+        # Keys from the listener thread; input_ready is emitted only when the
+        # queue goes from idle to busy, so bursts are handled as one batch.
+        self._input_queue = queue.SimpleQueue()
+        self._input_wake_pending = False
         self.buffer = ""
         self.words_found = 0
         self.longest_word = 0
         self.used_words = set()
         self.required_letter = None
         self.hidden_mode = False
-        self.kcontroller = KController()
+        self.ranking_mode = RANKING_MODES[0]
+        self.trap_search = TrapSearch(suggester) if suggester is not None else None
+        # Each update_ui bumps the token; searches started for an older token
+        # stop early and their results are ignored.
+        self._trap_token = 0
+        self._trap_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trap-search")
+        self._ranking_note = ""
+        self._fallback_notice = ""
+        self._no_words_left = False
+        self._prefix_mode = True
+        # Suggestions are computed by a SuggestionWorker unless async_suggestions
+        # is off (benchmarks and scripted runs), in which case update_ui blocks.
+        self.async_suggestions = async_suggestions
+        self.suggestion_worker = None
+        self._suggest_seq = 0
+        self._used_generation = 0
+        self._used_snapshot = frozenset()
+        self.tracer = LatencyTracer()
+        # The trace of the key being handled, and the one waiting for its paint.
+        self._trace = None
+        self._paint_trace = None
+        self.listener = None
+        self._key = None
         self._build_ui()
-        self.update_signal.connect(self.on_update_signal)
+        self.input_ready.connect(self.drain_input)
+        self.dictionary_ready.connect(self.on_dictionary_ready)
+        self.trap_ranking_ready.connect(self.on_trap_ranking_ready)
+        self.suggestions_ready.connect(self.on_suggestions_ready)
+        self.container.tracer = self.tracer
+        self.container.frame_painted.connect(self.on_frame_painted)
+        if self.suggester is None:
+            self.show_loading_state()
         self.show()
 
     # -------------------- _build_ui --------------------
@@ -323,11 +632,18 @@ class TypingOverlay(QtWidgets.QWidget):
         self.next_letter_label.setAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignBottom)
         self.next_letter_label.setStyleSheet("color:#ffaa00; background: transparent;")
         layout.addWidget(self.next_letter_label)
-        self.status_label = QtWidgets.QLabel("F7: hide/show | F6: new round | F8: quit | Enter: submit/reset")
+        self.status_label = QtWidgets.QLabel("F7: hide/show | F6: new round | F8: quit | F9: ranking | Enter: submit/reset")
         self.status_label.setStyleSheet("color:#888; font-size:11px; font-family:'Segoe UI'; background: transparent;")
         layout.addWidget(self.status_label)
         self.setFixedSize(OVERLAY_WIDTH, OVERLAY_HEIGHT)
         self.container.setGeometry(0,0,OVERLAY_WIDTH,OVERLAY_HEIGHT)
+        self.hud_label = QtWidgets.QLabel(self.container)
+        self.hud_label.setStyleSheet(
+            "color:#9fe8ff; background: rgba(0,0,0,170); font-size:10px; font-family:Consolas,monospace; padding:3px;")
+        self.hud_label.move(8,8)
+        self.hud_label.hide()
+        self.hud_timer = QtCore.QTimer(self)
+        self.hud_timer.timeout.connect(self.refresh_hud)
         self.move(20,250)
         self.old_pos = None
 
@@ -343,14 +659,97 @@ class TypingOverlay(QtWidgets.QWidget):
     def mouseReleaseEvent(self,event):
         self.old_pos = None
 
-    # -------------------- update signal --------------------
-    def on_update_signal(self,key_char):
-        if not self.isVisible(): return
+    # -------------------- dictionary loading --------------------
+    def show_loading_state(self):
+        self.suggest_label.setText("<span style='color:#888888'>Woordenlijst laden…</span>")
+        self.next_letter_label.setText("Laden…")
+
+    def load_dictionary_async(self, loader):
+        def work():
+            try:
+                suggester = loader()
+            except Exception as e:
+                print("Wordlist load error:", e)
+                suggester = WordSuggester(FALLBACK_WORDS)
+            self.dictionary_ready.emit(suggester)
+        threading.Thread(target=work, name="dictionary-loader", daemon=True).start()
+
+    def on_dictionary_ready(self, suggester):
+        mark_startup("dictionary loaded")
+        report_startup(len(suggester))
+        self.suggester = suggester
+        self.trap_search = TrapSearch(suggester)
+        if self.journal is not None:
+            self.restore_round(self.journal.restore(suggester))
+            mark_startup("round restored")
+        self.round_state_changed()
+        pending, self.pending_keys = self.pending_keys, []
+        for key_char in pending:
+            self.apply_key(key_char)
+        self.update_ui()
+
+    # -------------------- input pipeline --------------------
+    def queue_key(self,key_char):
+        """Queue a key from the listener thread; the GUI thread is woken once per burst."""
+        self._input_queue.put((key_char, time.perf_counter_ns() if self.tracer.enabled else None))
+        if not self._input_wake_pending:
+            self._input_wake_pending = True
+            self.input_ready.emit()
+
+    def drain_input(self):
+        # Clear the flag before draining: a key queued after this point either
+        # gets drained below or sees the flag down and wakes us again.
+        self._input_wake_pending = False
+        keys = []
+        while True:
+            try:
+                keys.append(self._input_queue.get_nowait())
+            except queue.Empty:
+                break
+        self.process_keys(keys)
+
+    def process_keys(self,keys):
+        """Apply a batch of (key, listener timestamp) pairs and refresh the UI once."""
+        trace = None
+        dirty = False
+        for key_char, listener_ns in keys:
+            if trace is None and self.tracer.enabled:
+                # A batch is traced from its oldest key.
+                trace = self.tracer.start(listener_ns)
+            dirty = self.apply_key(key_char) or dirty
+        if dirty:
+            self._trace = trace if self.tracer.enabled else None
+            self.update_ui()
+
+    def process_key(self,key_char):
+        self.process_keys([(key_char, None)])
+
+    def apply_key(self,key_char):
+        """Update the round state for one key; returns True if the UI needs a refresh."""
+        if key_char=="HUD":
+            self.toggle_hud()
+            return False
+        if key_char=="TRACE_EXPORT":
+            self.export_trace()
+            return False
+        if key_char=="QUIT":
+            QtWidgets.QApplication.quit()
+            return False
+        if key_char=="TOGGLE":
+            self.hidden_mode = not self.hidden_mode
+            self.setVisible(not self.hidden_mode)
+            return False
+        if key_char=="RESET":
+            return self.reset_round_state()
+        if not self.isVisible(): return False
+        if self.suggester is None:
+            self.pending_keys.append(key_char)
+            return False
 
         if key_char=="BACKSPACE":
             # Prevent backspace from deleting the required letter if it's the only one
             if self.buffer == self.required_letter:
-                return
+                return False
             self.buffer = self.buffer[:-1]
         elif key_char=="ENTER":
             submitted = self.buffer.lower()
@@ -359,158 +758,307 @@ class TypingOverlay(QtWidgets.QWidget):
                 if self.required_letter and not submitted.startswith(self.required_letter):
                     # Invalid word, don't accept it, just reset buffer to the required letter
                     self.buffer = self.required_letter
-                    self.update_ui()
-                    return
+                    return True
 
                 self.used_words.add(submitted)
                 self.suggester.remove_word(submitted)
+                self.round_state_changed()
                 self.words_found += 1
                 self.longest_word = max(self.longest_word, len(submitted))
                 
                 # --- New suffix-based chaining logic ---
                 # Use the last up-to-3 letters of the submitted word for the next required prefix,
                 # even if they overlap with the previously required letters (e.g., "sid" -> "sides" -> "des").
-                next_prefix = submitted[-3:] if submitted else ""
+                next_prefix = submitted[-CHAIN_SUFFIX_LENGTH:] if submitted else ""
 
                 self.required_letter = next_prefix
                 self.buffer = self.required_letter if self.required_letter else ""
+                if self.journal is not None:
+                    self.journal.submit(submitted, self.round_snapshot)
             else:
                 # If enter is pressed on empty/invalid string, reset buffer to required letter
                 self.buffer = self.required_letter if self.required_letter else ""
+        elif key_char=="RANKING":
+            self.cycle_ranking_mode()
         else:
             if re.match(r"[a-z]", key_char):
                 self.buffer += key_char.lower()
-        self.update_ui()
+        return True
 
     # -------------------- update UI --------------------
     def update_ui(self):
+        if self.suggester is None:
+            return
         fallback_notice = ""
 
-        def prepare_suggestions():
-            nonlocal fallback_notice
+        # If the suffix chosen by the game has no words left, relax it to the
+        # longest shorter suffix that still has some, so the user keeps seeing
+        # useful results. The suggester keeps per-suffix counts, so this is a lookup.
+        initial_required = self.required_letter or ""
+        final_required = self.suggester.viable_suffix(initial_required)
+        if final_required != initial_required:
+            failed_required = initial_required[len(initial_required) - len(final_required) - 1:]
+            shown_suffix = final_required or "geen specifieke"
+            fallback_notice = (
+                f"Geen matches voor '{failed_required}'. Overschakelen naar suffix {shown_suffix}.")
 
-            initial_required = self.required_letter or ""
-            attempt_required = initial_required
+            # If the buffer started with the old required suffix, trim the visible text too
             typed_word = self.buffer.lower()
-            attempt_buffer = typed_word
-
-            # If a long suffix was chosen by the game but yields nothing, gradually trim
-            # to a shorter suffix so the user keeps seeing useful results.
-            while True:
-                suggestions, prefix_mode = self.suggester.suggest(
-                    attempt_required, attempt_buffer, SUGGESTION_COUNT, self.used_words)
-                if suggestions or not attempt_required:
-                    return suggestions, prefix_mode, attempt_required, attempt_buffer
-
-                shortened_required = attempt_required[1:]
-                shown_suffix = shortened_required or "geen specifieke"
-                fallback_notice = (
-                    f"Geen matches voor '{attempt_required}'. Overschakelen naar suffix {shown_suffix}.")
-
-                # If the buffer started with the old required suffix, trim the visible text too
-                if typed_word.startswith(initial_required):
-                    drop = len(attempt_required) - len(shortened_required)
-                    attempt_buffer = typed_word[drop:]
-                else:
-                    attempt_buffer = shortened_required
-                attempt_required = shortened_required
-
-        suggestions, prefix_mode, final_required, final_buffer = prepare_suggestions()
-
-        # Align internal state if we had to relax the suffix requirement
-        if final_required != (self.required_letter or ""):
+            if typed_word.startswith(initial_required):
+                self.buffer = typed_word[len(initial_required) - len(final_required):]
+            else:
+                self.buffer = final_required
             self.required_letter = final_required
-            self.buffer = final_buffer
 
-        self.buffer_label.setText(f"typed: {self.buffer or '(empty)'}")
+        self._fallback_notice = fallback_notice
+        self._trap_token += 1
+        self._suggest_seq += 1
+        set_label_text(self.buffer_label, f"typed: {self.buffer or '(empty)'}")
+        request = SuggestionRequest(
+            self._suggest_seq, self.required_letter or "", self.buffer.lower(),
+            TRAP_CANDIDATES if self.ranking_mode == "val" else SUGGESTION_COUNT,
+            self.ranking_mode == "frequentie", self._used_snapshot, self._used_generation, self._trace)
+        self._trace = None
+        if not self.async_suggestions:
+            self.on_suggestions_ready(request, self.compute_suggestions(request))
+            return
+        if self.suggestion_worker is None:
+            self.suggestion_worker = SuggestionWorker(self.compute_suggestions,
+                                                      self.suggestions_ready.emit)
+        self.suggestion_worker.post(request)
+
+    def round_state_changed(self):
+        """Call after used_words or the suggester's removed words change."""
+        self._used_generation += 1
+        self._used_snapshot = frozenset(self.used_words)
+
+    def compute_suggestions(self, request):
+        # Runs on the suggestion thread when async_suggestions is on.
+        if request.trace:
+            LatencyTracer.stamp(request.trace, LatencyTracer.QUERY_START)
+        suggestions, prefix_mode = self.suggester.suggest(
+            request.required, request.letters, request.limit, request.used, request.by_frequency)
+        no_words_left = bool(request.required) and not self.suggester.remaining(request.required)
+        if request.trace:
+            LatencyTracer.stamp(request.trace, LatencyTracer.QUERY_END)
+        return suggestions, prefix_mode, no_words_left
+
+    def on_suggestions_ready(self, request, result):
+        if request.seq != self._suggest_seq or request.used_generation != self._used_generation:
+            return
+        suggestions, self._prefix_mode, self._no_words_left = result
+        if request.trace:
+            LatencyTracer.stamp(request.trace, LatencyTracer.RENDER_START)
+        self._ranking_note = "Ranking: frequentie" if request.by_frequency else ""
+        if self.ranking_mode == "val" and len(suggestions) > 1:
+            self._ranking_note = "Ranking: val"
+            self._trap_executor.submit(self._run_trap_search, self._trap_token, suggestions,
+                                       request.used)
+        self.show_suggestions(suggestions[:SUGGESTION_COUNT])
+        if request.trace:
+            LatencyTracer.stamp(request.trace, LatencyTracer.RENDER_END)
+            self._paint_trace = request.trace
+
+    # -------------------- latency tracing --------------------
+    def on_frame_painted(self, start_ns, end_ns):
+        self.tracer.record_frame(start_ns, end_ns)
+        if self._paint_trace is not None:
+            self._paint_trace[LatencyTracer.PAINT] = end_ns
+            self.tracer.commit(self._paint_trace)
+            self._paint_trace = None
+
+    def toggle_hud(self):
+        enabled = not self.tracer.enabled
+        self.tracer.set_enabled(enabled)
+        self._trace = self._paint_trace = None
+        self.hud_label.setVisible(enabled)
+        if enabled:
+            self.refresh_hud()
+            self.hud_timer.start(HUD_REFRESH_MS)
+        else:
+            self.hud_timer.stop()
+
+    def refresh_hud(self):
+        summary = self.tracer.summary()
+        def fmt(values):
+            return "/".join(f"{v:.1f}" for v in values) if values else "-"
+        self.hud_label.setText(
+            f"key→paint p50/95/99 {fmt(summary['key'])} ms\n"
+            f"query {fmt(summary['query'])} ms | frame {fmt(summary['frame'])} ms\n"
+            f"{summary['samples']} keys")
+        self.hud_label.adjustSize()
+        self.hud_label.raise_()
+
+    def export_trace(self):
+        path = os.path.abspath(time.strftime("llh-trace-%Y%m%d-%H%M%S.json"))
+        try:
+            print("Wrote", self.tracer.export_chrome_trace(path))
+        except OSError as e:
+            print("Trace export error:", e)
+
+    def _run_trap_search(self, token, candidates, used):
+        # Runs on the search thread; every finished depth is streamed to the GUI.
+        try:
+            for depth, ranked in self.trap_search.iter_rankings(
+                    candidates, used, TRAP_TIME_BUDGET, TRAP_MAX_DEPTH,
+                    cancelled=lambda: token != self._trap_token):
+                self.trap_ranking_ready.emit(token, depth, ranked[:SUGGESTION_COUNT])
+        except Exception as e:
+            print("Trap search error:", e)
+
+    def on_trap_ranking_ready(self, token, depth, ranked):
+        if token != self._trap_token:
+            return
+        self._ranking_note = f"Ranking: val (diepte {depth})"
+        self.show_suggestions(ranked)
+
+    def cycle_ranking_mode(self):
+        index = RANKING_MODES.index(self.ranking_mode)
+        self.ranking_mode = RANKING_MODES[(index + 1) % len(RANKING_MODES)]
+
+    def show_suggestions(self, suggestions):
+        prefix_mode = self._prefix_mode
+        no_words_left = self._no_words_left
+        fallback_notice = self._fallback_notice
+
+        set_label_text(self.buffer_label, f"typed: {self.buffer or '(empty)'}")
         best_word = suggestions[0] if suggestions else None
-        self.container.contains_mode = not prefix_mode
-        self.container.word_length = len(best_word) if best_word else len(self.buffer)
-        self.container.ready_for_fire = bool(suggestions)
+        self.container.set_word_state(not prefix_mode,
+                                      len(best_word) if best_word else len(self.buffer),
+                                      bool(suggestions))
 
-        self.required_label.setText(f"Last letters: {self.required_letter or '?'}")
-        self.score_label.setText(f"Score: {self.words_found} | Langste: {self.longest_word}")
+        set_label_text(self.required_label, f"Last letters: {self.required_letter or '?'}")
+        set_label_text(self.score_label, f"Score: {self.words_found} | Langste: {self.longest_word}")
 
         # next letter hint
         typed_word = self.buffer.lower()
         if self.required_letter and typed_word and not typed_word.startswith(self.required_letter):
             next_hint = f"Start met '{self.required_letter}'"
-            self.next_letter_label.setStyleSheet("color:#ff5555; background: transparent;")
-        elif not suggestions and self.required_letter:
+            hint_color = "#ff5555"
+        elif no_words_left:
             next_hint = "Geen woorden meer"
-            self.next_letter_label.setStyleSheet("color:#ff5555; background: transparent;")
+            hint_color = "#ff5555"
         elif not suggestions:
             next_hint = "Type om te starten"
-            self.next_letter_label.setStyleSheet("color:#ffaa00; background: transparent;")
+            hint_color = "#ffaa00"
         else:
             if len(typed_word) < len(best_word):
                 next_hint = best_word[len(typed_word)]
             else:
                 next_hint = "Druk op Enter"
-            self.next_letter_label.setStyleSheet("color:#00ff88; background: transparent;")
-        self.next_letter_label.setText(next_hint)
+            hint_color = "#00ff88"
+        set_label_style(self.next_letter_label, f"color:{hint_color}; background: transparent;")
+        set_label_text(self.next_letter_label, next_hint)
 
         # suggestions display
-        colored_words = []
-        for word in suggestions:
-            colored = ""
-            for i,c in enumerate(word):
-                if i < len(typed_word) and word.startswith(typed_word):
-                    colored += f"<span style='color:#00ff88; font-weight:700'>{c}</span>"
-                elif typed_word and typed_word in word and c.lower() in typed_word:
-                    colored += f"<span style='color:#3399ff; font-weight:700'>{c}</span>"
-                elif self.required_letter and i == 0 and c.lower() == self.required_letter:
-                    colored += f"<span style='color:#ffaa00; font-weight:700'>{c}</span>"
-                else:
-                    colored += f"<span style='color:#ff5555'>{c}</span>"
-            if word == best_word:
-                colored = f"<span style='background-color:rgba(255,215,0,0.12); padding:2px 4px;'>{colored}</span>"
-            colored_words.append(colored)
-        warning_suffix = " | Geen geldige woorden meer" if (self.required_letter and not colored_words) else ""
+        required = self.required_letter or ""
+        rows = [render_suggestion_row(word, typed_word, required, word == best_word)
+                for word in suggestions]
+        warning_suffix = " | Geen geldige woorden meer" if no_words_left else ""
         fallback_suffix = f" | {fallback_notice}" if fallback_notice else ""
-        self.status_label.setText(
-            f"F7: hide/show | F6: new round | F8: quit | Enter: submit/reset{warning_suffix}{fallback_suffix}")
-        self.suggest_label.setText("<span style='color:#ffffff'>no matches</span>" if not colored_words else "<br>".join(colored_words))
+        ranking_suffix = f" | {self._ranking_note}" if self._ranking_note else ""
+        set_label_text(self.status_label,
+            f"F7: hide/show | F6: new round | F8: quit | F9: ranking | Enter: submit/reset"
+            f"{warning_suffix}{fallback_suffix}{ranking_suffix}")
+        set_label_text(self.suggest_label,
+                       "<br>".join(rows) if rows else "<span style='color:#ffffff'>no matches</span>")
 
         # glow
         self.container.set_glow(bool(best_word))
 
     # -------------------- global key handler --------------------
-    def start_new_round(self):
+    def reset_round_state(self):
+        if self.suggester is None:
+            # Replayed after the journaled round is restored, so the reset is
+            # journaled too and that round does not come back.
+            self.pending_keys = ["RESET"]
+            return False
         self.suggester.reset_round()
         self.used_words = set()
+        self.round_state_changed()
         self.words_found = 0
         self.longest_word = 0
         self.required_letter = None
         self.buffer = ""
-        self.update_ui()
+        if self.journal is not None:
+            self.journal.reset(self.round_snapshot)
+        return True
+
+    def round_snapshot(self):
+        return {"used_words": sorted(self.used_words), "words_found": self.words_found,
+                "longest_word": self.longest_word, "required_letter": self.required_letter}
+
+    def restore_round(self, state):
+        # The suggester already has the round's words removed; only our side is left.
+        self.used_words = set(state["used_words"])
+        self.words_found = state["words_found"]
+        self.longest_word = state["longest_word"]
+        self.required_letter = state["required_letter"]
+        self.buffer = self.required_letter or ""
+
+    def start_listener(self):
+        # pynput is imported here so its startup cost lands after the overlay is shown.
+        from pynput import keyboard
+        self._key = keyboard.Key
+        self.listener = keyboard.Listener(on_press=self.handle_key)
+        self.listener.start()
 
     def handle_key(self,key):
+        # Runs on the listener thread: only translate and queue, the GUI thread does the rest.
         try:
             if hasattr(key,'char') and key.char and re.match(r"[a-zA-Z]",key.char):
-                self.update_signal.emit(key.char)
-            elif key==keyboard.Key.backspace:
-                self.update_signal.emit("BACKSPACE")
-            elif key==keyboard.Key.enter:
-                self.update_signal.emit("ENTER")
-            elif key==keyboard.Key.f8:
-                QtWidgets.QApplication.quit()
-            elif key==keyboard.Key.f7:
-                self.hidden_mode = not self.hidden_mode
-                self.setVisible(not self.hidden_mode)
-            elif key==keyboard.Key.f6:
-                self.start_new_round()
+                self.queue_key(key.char)
+            elif key==self._key.backspace:
+                self.queue_key("BACKSPACE")
+            elif key==self._key.enter:
+                self.queue_key("ENTER")
+            elif key==self._key.f8:
+                self.queue_key("QUIT")
+            elif key==self._key.f7:
+                self.queue_key("TOGGLE")
+            elif key==self._key.f6:
+                self.queue_key("RESET")
+            elif key==self._key.f9:
+                self.queue_key("RANKING")
+            elif key==self._key.f10:
+                self.queue_key("HUD")
+            elif key==self._key.f11:
+                self.queue_key("TRACE_EXPORT")
         except Exception as e:
             print("Key handling error:",e)
 
+# -------------------- startup report --------------------
+def report_startup(word_count):
+    print("Startup:", ", ".join(f"{label} {ms:.0f} ms" for label, ms in _startup_marks),
+          f"({word_count} words)")
+    report_path = os.environ.get(STARTUP_REPORT_ENV)
+    if report_path:
+        try:
+            with open(report_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"time": time.time(), "words": word_count,
+                                    "marks": {label: round(ms, 1) for label, ms in _startup_marks}}) + "\n")
+        except OSError as e:
+            print("Startup report error:", e)
+
 # -------------------- main --------------------
 def main():
-    words = load_wordlist()
-    suggester = WordSuggester(words)
+    if "--compile-wordlist" in sys.argv[1:]:
+        source_paths = find_wordlists()
+        if not source_paths:
+            sys.exit("No wordlist found.")
+        print("Wrote", compile_wordlist(source_paths, wordlist_cache_paths(source_paths)[0],
+                                        find_frequency_file()))
+        return
     app = QtWidgets.QApplication(sys.argv)
-    overlay = TypingOverlay(suggester)
-    listener = keyboard.Listener(on_press=overlay.handle_key)
-    listener.start()
+    journal = None if "--no-journal" in sys.argv[1:] else SessionJournal(get_session_dir())
+    overlay = TypingOverlay(journal=journal)
+    if journal is not None:
+        app.aboutToQuit.connect(journal.close)
+    app.processEvents()
+    mark_startup("overlay shown")
+    overlay.load_dictionary_async(load_suggester)
+    overlay.start_listener()
+    mark_startup("listener started")
     sys.exit(app.exec_())
 
 if __name__=="__main__":